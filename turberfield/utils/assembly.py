@@ -17,44 +17,180 @@
 # along with turberfield.  If not, see <http://www.gnu.org/licenses/>.
 
 
+import array
+import asyncio
+import base64
 from collections import Counter
 from collections import deque
 from collections import OrderedDict
+import codecs
+import collections.abc
+import concurrent.futures
 from decimal import Decimal
 from enum import Enum
-from inspect import getmembers
+import functools
+import hashlib
+import importlib
+import io
+import itertools
 import json
 import re
+import sys
+import types
+import typing
 from uuid import UUID
 
 from turberfield.utils.encoder import JSONEncoder
 
 class Assembly:
 
+    acyclic = set()
     decoding = {}
     encoding = {}
+    deferred = {}
+    factories = {}
+    numerics = {}
+    pending = {}
+    plans = {}
+    whitespace = re.compile(r"[ \t\n\r]*")
+
+    class Batch(collections.abc.Sequence):
+        """
+        A sequence of registered objects of one type, kept in columns.
+
+        This is how a columnar list is decoded. Objects are created only
+        when they are accessed, by the same hook which decoded the batch.
+
+        """
+
+        def __init__(self, tag=None, fields=None, values=None):
+            self.tag = tag
+            self.fields = fields
+            self.values = values
+            self.hook = Assembly.object_hook
+
+        def __len__(self):
+            return len(self.values[0]) if self.values else 0
+
+        def __getitem__(self, n):
+            if isinstance(n, slice):
+                return [self[i] for i in range(*n.indices(len(self)))]
+            obj = dict(zip(self.fields, [i[n] for i in self.values]))
+            obj["_type"] = self.tag
+            return self.hook(obj)
+
+    class Decoder(json.JSONDecoder):
+        """
+        Decodes registered types according to their numeric annotations.
+        See :py:meth:`numeric_hook <turberfield.utils.assembly.Assembly.numeric_hook>`.
+
+        """
+
+        def __init__(self, parse_float=Decimal):
+            super().__init__(
+                object_hook=functools.partial(
+                    Assembly.numeric_hook, parse_float=parse_float
+                ),
+                parse_float=Decimal
+            )
+            self.numeric = parse_float
+
+        def raw_decode(self, s, idx=0):
+            obj, end = super().raw_decode(s, idx)
+            if self.numeric is not Decimal:
+                obj = Assembly.reparse(obj, self.numeric)
+            return obj, end
 
     class Encoder(JSONEncoder):
 
+        buffers = {bytes: True, bytearray: True, memoryview: True, array.array: True}
+        byteorders = {"<": "little", ">": "big", "!": "big"}
+
+        def __init__(self, *args, typed=False, **kwargs):
+            super().__init__(*args, **kwargs)
+            self.typed = typed
+
+        def signature(self):
+            return super().signature() + (self.typed,)
+
+        def view(self, obj):
+            """
+            Return a JSON representation of `obj` if it supports the
+            buffer protocol, otherwise None.
+
+            Whether a type supports the protocol is found out from its
+            first object, and remembered in `buffers`.
+
+            """
+            typ = type(obj)
+            buffer = self.buffers.get(typ)
+            if buffer is False:
+                return None
+
+            try:
+                view = memoryview(obj)
+            except TypeError:
+                self.buffers[typ] = False
+                return None
+            except ValueError:
+                # The type has a buffer, but this object cannot export it.
+                return None
+            if buffer is None:
+                self.buffers[typ] = True
+
+            code = view.format.lstrip("@=<>!")
+            if (
+                self.typed and view.ndim == 1 and code in array.typecodes and
+                array.array(code).itemsize == view.itemsize
+            ):
+                byteorder = self.byteorders.get(view.format[0], sys.byteorder)
+                return {
+                    "_type": Assembly.buffer.tag,
+                    "typecode": code,
+                    "byteorder": byteorder,
+                    "data": base64.b64encode(
+                        view if view.c_contiguous else view.tobytes()
+                    ).decode("ascii"),
+                }
+            return view.tolist()
+
+        def columns(self, seq):
+            typ = type(seq[0])
+            fields = getattr(typ, "_fields", None)
+            if not fields or len(seq) < 2 or typ not in Assembly.plans:
+                return None
+            if len(set(map(type, seq))) > 1:
+                return None
+            return {
+                "_type": Assembly.Batch.tag,
+                "tag": Assembly.encoding[typ],
+                "fields": list(fields),
+                "values": list(zip(*seq)),
+            }
+
         def default(self, obj):
+            plan = Assembly.plans.get(type(obj), None)
+            if plan is not None:
+                return plan(obj)
+
             tag = Assembly.encoding.get(type(obj), None)
             if tag is not None:
-                rv = dict(_type=tag)
-                try:
-                    attribs = obj._asdict()
-                except AttributeError:
-                    if isinstance(obj, Enum):
-                        attribs = {"name": obj.name, "value": obj.value}
-                    elif isinstance(obj, UUID):
-                        attribs = {"int": obj.int}
-                    else:
-                        attribs = vars(obj)
-                rv.update(attribs)
-                return rv
+                plan = Assembly.plans[type(obj)] = Assembly.plan(type(obj), tag)
+                return plan(obj)
+
+            if Assembly.deferred:
+                typ = type(obj)
+                tag = Assembly.deferred.get((typ.__module__, typ.__qualname__), None)
+                if tag is not None and Assembly.resolve(tag) is typ:
+                    return Assembly.plans[typ](obj)
 
             if isinstance(obj, (Counter, OrderedDict)):
                 return list(obj.items())
 
+            rv = self.view(obj)
+            if rv is not None:
+                return rv
+
             try:
                 return JSONEncoder.default(self, obj)
             except TypeError as e:
@@ -77,7 +213,79 @@ class Assembly:
                         )
 
     @staticmethod
-    def register(*args, namespace=None):
+    def buffer(typecode, byteorder, data, **kwargs):
+        """
+        Create an `array.array` from its typed representation. The data
+        is copied straight into the array's memory.
+
+        """
+        rv = array.array(typecode)
+        rv.frombytes(base64.b64decode(data))
+        if byteorder != sys.byteorder:
+            rv.byteswap()
+        return rv
+
+    @staticmethod
+    def plan(typ, tag):
+        """
+        Return a function which encodes objects of type `typ` as a
+        dictionary tagged with `tag`.
+
+        The function is chosen once according to the kind of type
+        (namedtuple, Enum, UUID, slotted or plain class) so that
+        encoding an object needs no further inspection of it.
+
+        """
+        if issubclass(typ, tuple) and hasattr(typ, "_fields"):
+            fields = typ._fields
+
+            def encode(obj):
+                rv = {"_type": tag}
+                rv.update(zip(fields, obj))
+                return rv
+
+        elif hasattr(typ, "_asdict"):
+            def encode(obj):
+                rv = {"_type": tag}
+                rv.update(obj._asdict())
+                return rv
+
+        elif issubclass(typ, Enum):
+            def encode(obj):
+                return {"_type": tag, "name": obj.name, "value": obj.value}
+
+        elif issubclass(typ, UUID):
+            def encode(obj):
+                return {"_type": tag, "int": obj.int}
+
+        else:
+            slots = []
+            for cls in reversed(typ.__mro__):
+                names = cls.__dict__.get("__slots__", ())
+                if isinstance(names, str):
+                    names = (names,)
+                slots.extend(i for i in names if i not in ("__dict__", "__weakref__"))
+
+            if not slots:
+                def encode(obj):
+                    rv = {"_type": tag}
+                    rv.update(vars(obj))
+                    return rv
+
+            else:
+                def encode(obj):
+                    rv = {"_type": tag}
+                    rv.update(
+                        (name, getattr(obj, name))
+                        for name in slots if hasattr(obj, name)
+                    )
+                    rv.update(getattr(obj, "__dict__", {}))
+                    return rv
+
+        return encode
+
+    @staticmethod
+    def register(*args, namespace=None, acyclic=False):
         """
         Call this function to register your classes for Assembly.
 
@@ -102,35 +310,227 @@ class Assembly:
 
             Assembly.register(Colour)
 
+        Pass `acyclic=True` to declare that objects of your types never
+        contain references back to themselves. The encoder will then skip
+        its check for circular references beneath them.
+
         """
         tmplt = "{module}.{name}" if namespace is None else "{namespace}.{module}.{name}"
         for arg in args:
-            module = dict(getmembers(arg)).get("__module__")
             tag = tmplt.format(
                 namespace=namespace,
-                module=module,
+                module=arg.__module__,
                 name=arg.__name__
             )
-            Assembly.decoding[tag] = arg
-            Assembly.encoding[arg] = tag
+            Assembly.bind(tag, arg)
+            if acyclic:
+                Assembly.acyclic.add(arg)
 
         return list(Assembly.encoding.keys())
 
+    @staticmethod
+    def bind(tag, arg):
+        """
+        Register the type `arg` with Assembly under `tag`.
+
+        """
+        Assembly.decoding[tag] = arg
+        Assembly.encoding[arg] = tag
+        Assembly.factories[tag] = getattr(arg, "factory", arg)
+        Assembly.plans[arg] = Assembly.plan(arg, tag)
+        if issubclass(arg, (Enum, UUID)):
+            Assembly.acyclic.add(arg)
+        try:
+            hints = typing.get_type_hints(arg)
+        except Exception:
+            hints = getattr(arg, "__annotations__", {})
+        numerics = {k: v for k, v in hints.items() if v in (float, Decimal)}
+        if numerics:
+            Assembly.numerics[tag] = numerics
+        return arg
+
+    @staticmethod
+    def snapshot():
+        """
+        Return a table of the types registered so far. It maps each tag
+        to the module and qualified name of its type, and may be saved
+        as JSON.
+
+        """
+        return {
+            tag: [cls.__module__, cls.__qualname__]
+            for tag, cls in Assembly.decoding.items()
+        }
+
+    @staticmethod
+    def restore(table):
+        """
+        Prepare Assembly to use the types in `table`, which was made by
+        :py:meth:`snapshot <turberfield.utils.assembly.Assembly.snapshot>`.
+
+        Nothing is imported until a tag or type is first encountered,
+        when its class is resolved and registered. So a worker process may
+        call this as the initializer of its pool.
+        Types must be importable by their qualified name.
+
+        """
+        for tag, (module, name) in table.items():
+            if tag not in Assembly.decoding:
+                Assembly.pending[tag] = (module, name)
+                Assembly.deferred[(module, name)] = tag
+
+    @staticmethod
+    def resolve(tag):
+        """
+        Import and register the type which was restored under `tag`.
+        Returns the type, or None if it cannot be found.
+
+        """
+        try:
+            module, name = Assembly.pending.pop(tag)
+        except KeyError:
+            return None
+
+        Assembly.deferred.pop((module, name), None)
+        try:
+            rv = importlib.import_module(module)
+            for attr in name.split("."):
+                rv = getattr(rv, attr)
+        except (ImportError, AttributeError):
+            return None
+        else:
+            return Assembly.bind(tag, rv)
+
     @staticmethod
     def object_hook(obj):
-        typ = obj.pop("_type", None)
-        cls = Assembly.decoding.get(typ, None)
+        if "_type" not in obj:
+            return obj
+
+        typ = obj.pop("_type")
+        factory = Assembly.factories.get(typ, None)
+        if factory is None:
+            cls = Assembly.decoding.get(typ, None) or Assembly.resolve(typ)
+            if cls is None:
+                return obj
+            factory = Assembly.factories[typ] = getattr(cls, "factory", cls)
+
         try:
-            factory = getattr(cls, "factory", cls)
             return factory(**obj)
         except TypeError:
             return obj
 
+    @staticmethod
+    def numeric_hook(obj, parse_float=Decimal):
+        """
+        An object hook for JSON whose numbers have been parsed as Decimal.
+        It first converts numeric fields to the type (float or Decimal)
+        with which the registered class annotates them. Other numbers
+        are passed to `parse_float`.
+
+        """
+        typ = obj.get("_type")
+        if typ == Assembly.Batch.tag:
+            # Columns are converted item by item, as they are accessed.
+            rv = Assembly.object_hook(obj)
+            if isinstance(rv, Assembly.Batch):
+                rv.hook = functools.partial(Assembly.numeric_hook, parse_float=parse_float)
+            return rv
+        if typ in Assembly.pending:
+            Assembly.resolve(typ)
+        numerics = Assembly.numerics.get(typ, {})
+        if parse_float is not Decimal:
+            for name, val in obj.items():
+                if name not in numerics:
+                    obj[name] = Assembly.reparse(val, parse_float)
+        for name, typ in numerics.items():
+            val = obj.get(name)
+            if typ is float and type(val) is Decimal:
+                obj[name] = float(val)
+        return Assembly.object_hook(obj)
+
+    @staticmethod
+    def reparse(val, parse_float):
+        """
+        Pass the text of `val` to `parse_float` if it is a Decimal. The
+        members of a list are treated likewise.
+
+        """
+        if type(val) is Decimal:
+            return parse_float(str(val))
+        elif type(val) is list:
+            val[:] = [Assembly.reparse(i, parse_float) for i in val]
+        return val
+
+    @staticmethod
+    def decoder(parse_float=Decimal, annotations=False):
+        """
+        Return a JSON decoder for registered types.
+
+        `parse_float` is called with the text of every JSON number which
+        has a fraction or exponent. Pass `float` to skip the cost of
+        creating Decimal objects when exact round-trips are not needed.
+
+        If `annotations` is True, fields which a registered class annotates
+        as `float` or `Decimal` are converted to that type. Numbers are
+        then first parsed as Decimal, so that no precision is lost.
+
+        """
+        if annotations:
+            return Assembly.Decoder(parse_float)
+        return json.JSONDecoder(
+            object_hook=Assembly.object_hook, parse_float=parse_float
+        )
+
+    @staticmethod
+    def blocks(chunks, blocksize=65536, encoding="utf-8"):
+        """
+        Gather the string `chunks` from an encoder into blocks of at least
+        `blocksize` characters. If `encoding` is not None, the blocks are
+        generated as bytes.
+
+        """
+        buf = []
+        n = 0
+        for chunk in chunks:
+            buf.append(chunk)
+            n += len(chunk)
+            if n >= blocksize:
+                block = "".join(buf)
+                yield block if encoding is None else block.encode(encoding)
+                buf.clear()
+                n = 0
+        if buf:
+            block = "".join(buf)
+            yield block if encoding is None else block.encode(encoding)
+
+    @staticmethod
+    def digest(obj, digest=None, **kwargs):
+        """
+        Return the hex digest of the canonical encoding of `obj`. That is
+        the compact JSON form with sorted keys, so objects which would
+        encode the same have the same digest. The bytes are hashed as
+        they are emitted; no string of the whole document is made.
+
+        By default the hash is a 128 bit BLAKE2b. Pass another `digest`
+        object from `hashlib` if you prefer.
+
+        Other keyword arguments are those of
+        :py:meth:`dumps <turberfield.utils.assembly.Assembly.dumps>`.
+
+        """
+        if digest is None:
+            digest = hashlib.blake2b(digest_size=16)
+        kwargs.setdefault("sort_keys", True)
+        kwargs.setdefault("separators", (",", ":"))
+        for block in Assembly.blocks(Assembly.Encoder(**kwargs).iterencode(obj)):
+            digest.update(block)
+        return digest.hexdigest()
+
     @staticmethod
     def dump(
         obj, fp, skipkeys=False, ensure_ascii=True, check_circular=True,
         allow_nan=True, cls=None, indent=None, separators=None,
-        default=None, sort_keys=False, **kwargs
+        default=None, sort_keys=False, blocksize=None, digest=None, **kwargs
     ):
         """
         Serialize `obj` as a JSON formatted stream to `fp`.
@@ -138,6 +538,13 @@ class Assembly:
         This function is compatible with `json.dump`_ from Python's
         standard library, and accepts the same arguments.
 
+        If `blocksize` is given, output is gathered into blocks of that
+        size before each write. In that mode `fp` may also be a binary
+        file object, to which the blocks are written UTF-8 encoded.
+
+        If `digest` is a hash object from `hashlib`, it is updated with
+        the UTF-8 encoding of the output as it is written.
+
         .. _json.dump: https://docs.python.org/3/library/json.html#json.dump
         """
         dumper = Assembly.Encoder(
@@ -146,8 +553,78 @@ class Assembly:
             indent=indent, separators=separators, default=default,
             sort_keys=sort_keys, **kwargs
         ).iterencode(obj)
-        for chunk in dumper:
-            fp.write(chunk)
+        if blocksize is not None:
+            encoding = None if isinstance(fp, io.TextIOBase) else "utf-8"
+            dumper = Assembly.blocks(dumper, blocksize, encoding)
+        if digest is None:
+            for chunk in dumper:
+                fp.write(chunk)
+        else:
+            for chunk in dumper:
+                fp.write(chunk)
+                digest.update(chunk.encode("utf-8") if isinstance(chunk, str) else chunk)
+
+    @staticmethod
+    @types.coroutine
+    def dump_async(
+        obj, writer, blocksize=65536, encoding="utf-8", executor=None, loop=None, **kwargs
+    ):
+        """
+        Serialize `obj` as a JSON formatted stream to `writer` without
+        blocking the event loop.
+
+        Output is encoded in blocks of `blocksize` characters. After
+        each write, the coroutine awaits `writer.drain()` if there is
+        one (as for an asyncio `StreamWriter`). It then yields to the loop,
+        since a drain returns at once unless the transport is paused.
+        So other tasks run between blocks. Blocks are written as bytes
+        unless `encoding` is None.
+
+        If you supply a thread pool `executor`, encoding is done there
+        instead of on the loop.
+
+        Other keyword arguments are those of
+        :py:meth:`dumps <turberfield.utils.assembly.Assembly.dumps>`.
+
+        This method is a coroutine_.
+
+        .. _coroutine: https://docs.python.org/3/library/asyncio-task.html#coroutine
+        """
+        loop = loop or asyncio.get_event_loop()
+        blocks = Assembly.blocks(
+            Assembly.Encoder(**kwargs).iterencode(obj), blocksize, encoding
+        )
+        drain = getattr(writer, "drain", None)
+        while True:
+            if executor is None:
+                block = next(blocks, None)
+            else:
+                block = yield from loop.run_in_executor(executor, next, blocks, None)
+            if block is None:
+                break
+            writer.write(block)
+            if drain is not None:
+                yield from drain()
+            yield from asyncio.sleep(0)
+
+    @staticmethod
+    def dumpb(
+        obj, skipkeys=False, ensure_ascii=True, check_circular=True,
+        allow_nan=True, cls=None, indent=None, separators=None,
+        default=None, sort_keys=False, **kwargs
+    ):
+        """
+        Serialize `obj` to JSON as UTF-8 encoded bytes.
+
+        This function accepts the same arguments as
+        :py:meth:`dumps <turberfield.utils.assembly.Assembly.dumps>`.
+        """
+        return Assembly.dumps(
+            obj, skipkeys=skipkeys, ensure_ascii=ensure_ascii,
+            check_circular=check_circular, allow_nan=allow_nan,
+            indent=indent, separators=separators, default=default,
+            sort_keys=sort_keys, **kwargs
+        ).encode("utf-8")
 
     @staticmethod
     def dumps(
@@ -161,6 +638,11 @@ class Assembly:
         This function is compatible with `json.dumps`_ from Python's
         standard library, and accepts the same arguments.
 
+        Objects which support the buffer protocol (`array.array`,
+        `memoryview` and the like) are encoded as JSON arrays. Pass
+        `typed=True` to encode one-dimensional buffers instead as their
+        typecode and base64 data. These decode to `array.array`.
+
         .. _json.dumps: https://docs.python.org/3/library/json.html#json.dumps
         """
         return Assembly.Encoder(
@@ -171,16 +653,189 @@ class Assembly:
         ).encode(obj)
 
     @staticmethod
-    def loads(s):
+    def fragment(items, kwargs):
+        """
+        Encode a slice of a sequence for
+        :py:meth:`dumps_parallel <turberfield.utils.assembly.Assembly.dumps_parallel>`.
+        Returns the text between the brackets of the JSON array.
+
+        """
+        if not items:
+            return ""
+
+        text = Assembly.dumps(list(items), **kwargs)
+        if kwargs.get("indent") is None:
+            return text[1:-1]
+        else:
+            return text[1:-2]
+
+    @staticmethod
+    def fragments(seq, executor=None, workers=None, chunksize=1024, **kwargs):
+        """
+        Encode the items of `seq` in slices of `chunksize` across a pool
+        of processes. Generates the encoded slices in order.
+
+        """
+        chunks = (
+            seq[n:n + chunksize] for n in range(0, len(seq), chunksize)
+        )
+        if executor is None:
+            with concurrent.futures.ProcessPoolExecutor(max_workers=workers) as pool:
+                yield from pool.map(Assembly.fragment, chunks, itertools.repeat(kwargs))
+        else:
+            yield from executor.map(Assembly.fragment, chunks, itertools.repeat(kwargs))
+
+    @staticmethod
+    def dump_parallel(seq, fp, executor=None, workers=None, chunksize=1024, **kwargs):
+        """
+        Serialize the sequence `seq` as a JSON array to `fp`, encoding its
+        items in parallel. The output is identical to that of
+        :py:meth:`dump <turberfield.utils.assembly.Assembly.dump>`.
+
+        Slices of `chunksize` items are sent to a
+        `concurrent.futures.ProcessPoolExecutor`_ of `workers` processes,
+        or to the `executor` you supply. Items must be picklable. Worker
+        processes must have the same types registered; this is so when they
+        are forked from the process which registered them. Otherwise,
+        supply an executor with an initializer which does the registration.
+
+        With `columnar=True`, `seq` itself may be written as one batch of
+        columns. Slices can't be encoded apart then, so it is encoded
+        serially.
+
+        Other keyword arguments are those of
+        :py:meth:`dumps <turberfield.utils.assembly.Assembly.dumps>`.
+
+        .. _concurrent.futures.ProcessPoolExecutor: https://docs.python.org/3/library/concurrent.futures.html#processpoolexecutor
+        """  # noqa: E501
+        if kwargs.get("columnar"):
+            return Assembly.dump(seq, fp, **kwargs)
+
+        encoder = Assembly.Encoder(
+            indent=kwargs.get("indent"), separators=kwargs.get("separators")
+        )
+        tail = "]" if encoder.indent is None else "\n]"
+        fragments = filter(None, Assembly.fragments(
+            seq, executor=executor, workers=workers, chunksize=chunksize, **kwargs
+        ))
+        fp.write("[")
+        n = None
+        for n, text in enumerate(fragments):
+            if n:
+                fp.write(encoder.item_separator)
+            fp.write(text)
+        fp.write("]" if n is None else tail)
+
+    @staticmethod
+    def dumps_parallel(seq, executor=None, workers=None, chunksize=1024, **kwargs):
+        """
+        Serialize the sequence `seq` to a JSON formatted string, encoding
+        its items in parallel. See
+        :py:meth:`dump_parallel <turberfield.utils.assembly.Assembly.dump_parallel>`.
+
+        """
+        fObj = io.StringIO()
+        Assembly.dump_parallel(
+            seq, fObj, executor=executor, workers=workers, chunksize=chunksize, **kwargs
+        )
+        return fObj.getvalue()
+
+    @staticmethod
+    def loads(s, parse_float=Decimal, annotations=False):
         """
         Deserialize a JSON string to Python object(s). Those types you
         have registered will be recognised and used to create the
         deserialised objects.
 
+        By default, numbers with a fraction become Decimal objects. See
+        :py:meth:`decoder <turberfield.utils.assembly.Assembly.decoder>`
+        for the use of `parse_float` and `annotations`.
+
         """
+        if annotations:
+            return json.loads(s, cls=Assembly.Decoder, parse_float=parse_float)
         return json.loads(
             s,
             object_hook=Assembly.object_hook,
             # object_pairs_hook=OrderedDict,
-            parse_float=Decimal
+            parse_float=parse_float
         )
+
+    @staticmethod
+    def loads_many(docs, parse_float=Decimal, annotations=False):
+        """
+        Deserialize each of a sequence of JSON strings. Returns a list
+        of the Python object(s) they contain.
+
+        """
+        decoder = Assembly.decoder(parse_float, annotations)
+        return [decoder.decode(s) for s in docs]
+
+    @staticmethod
+    def iterload(fp, bufsize=65536, parse_float=Decimal, annotations=False):
+        """
+        Deserialize a sequence of JSON documents from `fp`, generating
+        Python object(s) one at a time. Documents may be separated by
+        whitespace, as they are in the RSON files written by an
+        :py:class:`Expert <turberfield.utils.expert.Expert>`.
+
+        `fp` may be a text or binary file object, or a socket. Data is
+        read `bufsize` characters at a time. The buffer holds no more
+        than the document being decoded and the chunk which completes it.
+
+        A malformed document raises `json.JSONDecodeError` as soon as
+        the line which holds the fault has been read. The `pos` of the
+        error is its offset from the start of the stream.
+
+        """
+        decoder = Assembly.decoder(parse_float, annotations)
+        read = getattr(fp, "read", None) or fp.recv
+        utf8 = codecs.getincrementaldecoder("utf-8")()
+        text = ""
+        offset = 0
+        pos = 0
+        size = bufsize
+        eof = False
+        while True:
+            pos = Assembly.whitespace.match(text, pos).end()
+            if pos < len(text):
+                try:
+                    obj, end = decoder.raw_decode(text, pos)
+                except json.JSONDecodeError as e:
+                    # No more data can mend a fault which ends its line.
+                    if eof or text.find("\n", e.pos) != -1:
+                        err = json.JSONDecodeError(e.msg, text, e.pos)
+                        err.pos = offset + e.pos
+                        err.args = ("{0}: char {1}".format(e.msg, err.pos),)
+                        raise err from None
+                    # An incomplete document; read more, and more each time.
+                    size = max(bufsize, len(text) - pos)
+                else:
+                    # A number at the end of the buffer may be incomplete.
+                    if end < len(text) or eof:
+                        yield obj
+                        pos = end
+                        size = bufsize
+                        continue
+            elif eof:
+                return
+
+            chunk = read(size)
+            eof = not chunk
+            if isinstance(chunk, bytes):
+                chunk = utf8.decode(chunk, final=eof)
+            offset += pos
+            text = text[pos:] + chunk
+            pos = 0
+
+
+Assembly.Encoder.acyclic = Assembly.acyclic
+# Tagged as Assembly.register would tag them.
+Assembly.buffer.tag = "{0}.{1}".format(Assembly.buffer.__module__, Assembly.buffer.__name__)
+Assembly.factories[Assembly.buffer.tag] = Assembly.buffer
+Assembly.Batch.tag = "{0}.{1}".format(Assembly.Batch.__module__, Assembly.Batch.__name__)
+Assembly.factories[Assembly.Batch.tag] = Assembly.Batch
+Assembly.plans[Assembly.Batch] = lambda obj: {
+    "_type": Assembly.Batch.tag,
+    "tag": obj.tag, "fields": obj.fields, "values": obj.values
+}
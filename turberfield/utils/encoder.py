@@ -1,6 +1,11 @@
 """Implementation of JSONEncoder
 """
+from collections import OrderedDict
+import datetime
+from decimal import Decimal
+from enum import Enum
 import re
+from uuid import UUID
 
 try:
     from _json import encode_basestring_ascii as c_encode_basestring_ascii
@@ -11,7 +16,10 @@ try:
 except ImportError:
     c_encode_basestring = None
 
-c_make_encoder = None
+try:
+    from _json import make_encoder as c_make_encoder
+except ImportError:
+    c_make_encoder = None
 
 ESCAPE = re.compile(r'[\x00-\x1f\\"\b\f\n\r\t]')
 ESCAPE_ASCII = re.compile(r'([\\"]|[^\ -~])')
@@ -69,6 +77,89 @@ def py_encode_basestring_ascii(s):
 encode_basestring_ascii = (
     c_encode_basestring_ascii or py_encode_basestring_ascii)
 
+class FragmentCache(object):
+    """A bounded LRU cache of encoded fragments.
+
+    Objects are looked up by identity and, when output is indented, by
+    the nesting level which sets their indentation. Only objects known
+    to be immutable are stored. Those are Enum members, UUIDs, Decimals,
+    dates and times, numbers and strings, objects of the types in the set
+    `immutable`, and tuples (including namedtuples) which hold nothing but
+    these. Each entry keeps its object alive so that its id cannot be
+    reused while it is cached. Only lookups of those objects count as hits
+    or misses.
+
+    Pass the same cache to successive encoders to share fragments between
+    calls. It is cleared whenever it is used with different settings.
+
+    """
+
+    atoms = frozenset((
+        str, int, float, bool, type(None), bytes, complex, Decimal,
+        datetime.date, datetime.datetime, datetime.time, datetime.timedelta
+    ))
+
+    def __init__(self, maxsize=1024, immutable=frozenset()):
+        self.maxsize = maxsize
+        self.immutable = frozenset(immutable)
+        self.hits = 0
+        self.misses = 0
+        self.fragments = OrderedDict()
+        self.signature = None
+
+    @property
+    def hit_rate(self):
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def bind(self, signature):
+        if signature != self.signature:
+            self.fragments.clear()
+            self.signature = signature
+
+    def get(self, o, level):
+        key = (id(o), level)
+        entry = self.fragments.get(key)
+        if entry is not None and entry[0] is o:
+            self.hits += 1
+            self.fragments.move_to_end(key)
+            return entry[1]
+        self.misses += 1
+        return None
+
+    def put(self, o, level, fragment):
+        self.fragments[(id(o), level)] = (o, fragment)
+        if len(self.fragments) > self.maxsize:
+            self.fragments.popitem(last=False)
+
+    def eligible(self, o):
+        typ = type(o)
+        if typ in self.atoms or typ in self.immutable or isinstance(o, (Enum, UUID)):
+            return True
+        elif isinstance(o, tuple):
+            return all(self.eligible(i) for i in o)
+        else:
+            return False
+
+
+class Indentation(dict):
+    """
+    Maps a level of nesting to the newline and the item separator for
+    pretty-printed output. Each is built once, on first use.
+
+    """
+
+    def __init__(self, indent, item_separator):
+        super().__init__()
+        self.indent = indent
+        self.item_separator = item_separator
+
+    def __missing__(self, level):
+        newline_indent = '\n' + self.indent * level
+        rv = self[level] = (newline_indent, self.item_separator + newline_indent)
+        return rv
+
+
 class JSONEncoder(object):
     """Extensible JSON <http://json.org> encoder for Python data structures.
 
@@ -100,11 +191,13 @@ class JSONEncoder(object):
     """
     item_separator = ', '
     key_separator = ': '
+    acyclic = frozenset()
 
     def __init__(
         self, skipkeys=False, ensure_ascii=True,
         check_circular=True, allow_nan=True, sort_keys=False,
-        indent=None, separators=None, default=None
+        indent=None, separators=None, default=None, fast=False,
+        columnar=False, cache=None, circular_depth=0, acyclic=None
     ):
         """Constructor for JSONEncoder, with sensible defaults.
 
@@ -144,6 +237,27 @@ class JSONEncoder(object):
         that can't otherwise be serialized.  It should return a JSON encodable
         version of the object or raise a ``TypeError``.
 
+        If fast is true, then compact one-shot encoding is done by the
+        C accelerator from the standard library where it is available.
+        Objects which would not be inlined by this encoder (subclasses
+        of tuple and dict, as well as anything handled by `default`)
+        are resolved first, so the output is the same as that of the
+        pure Python encoder.
+
+        If columnar is true, then each list or tuple is first offered to
+        the `columns` method, which may return an object to be encoded
+        in its place.
+
+        If cache is a FragmentCache, then the encoded form of immutable
+        objects handled by `default` is kept there and reused. If cache is
+        True, a new FragmentCache is used for each call to `iterencode`.
+        Caching disables the fast path.
+
+        If check_circular is true, circular_depth sets the level of nesting
+        at which the check begins. Any cycle must nest without limit, so is
+        still detected. Objects of a type in the set acyclic are declared
+        to be tree-shaped; nothing beneath them is checked.
+
         """
 
         self.skipkeys = skipkeys
@@ -158,6 +272,12 @@ class JSONEncoder(object):
             self.item_separator = ','
         if default is not None:
             self.default = default
+        self.fast = fast
+        self.columnar = columnar
+        self.cache = cache
+        self.circular_depth = circular_depth
+        if acyclic is not None:
+            self.acyclic = acyclic
 
     def default(self, o):
         """Implement this method in a subclass such that it returns
@@ -180,6 +300,30 @@ class JSONEncoder(object):
         """
         raise TypeError(repr(o) + " is not JSON serializable")
 
+    def columns(self, seq):
+        """Implement this method in a subclass such that it returns
+        a column-wise representation of the list or tuple ``seq``, or
+        None to have it encoded as an array.
+
+        It is called only when the encoder is created with columnar=True.
+
+        """
+        return None
+
+    def signature(self):
+        """Return a tuple of those settings which affect the output.
+        A FragmentCache is cleared when it is used with different settings.
+
+        Extend this method in a subclass which adds settings of its own.
+
+        """
+        return (
+            type(self), getattr(self.default, "__func__", self.default),
+            self.indent, self.item_separator, self.key_separator,
+            self.sort_keys, self.ensure_ascii, self.allow_nan,
+            self.skipkeys, self.columnar
+        )
+
     def encode(self, o):
         """Return a JSON string representation of a Python data structure.
 
@@ -246,21 +390,40 @@ class JSONEncoder(object):
             return text
 
 
-        if (_one_shot and c_make_encoder is not None and self.indent is None):
-            _iterencode = c_make_encoder(
-                markers, self.default, _encoder, self.indent,
+        if self.cache is True:
+            _cache = FragmentCache()
+        else:
+            _cache = self.cache
+        if _cache is not None:
+            _cache.bind(self.signature())
+
+        if (
+            _one_shot and self.fast and _cache is None and
+            c_make_encoder is not None and self.indent is None
+        ):
+            _resolve = _make_resolve(
+                markers, self.default, self.skipkeys,
+                self.columns if self.columnar else None
+            )
+            _c_iterencode = c_make_encoder(
+                None, self.default, _encoder, self.indent,
                 self.key_separator, self.item_separator, self.sort_keys,
                 self.skipkeys, self.allow_nan)
+            _iterencode = lambda o, _current_indent_level: _c_iterencode(
+                _resolve(o), _current_indent_level
+            )
         else:
             _iterencode = _make_iterencode(
                 markers, self.default, _encoder, self.indent, floatstr,
                 self.key_separator, self.item_separator, self.sort_keys,
-                self.skipkeys, _one_shot)
+                self.skipkeys, _one_shot, self.columns if self.columnar else None,
+                _cache, self.circular_depth, self.acyclic)
         return _iterencode(o, 0)
 
 def _make_iterencode(
     markers, _default, _encoder, _indent, _floatstr,
     _key_separator, _item_separator, _sort_keys, _skipkeys, _one_shot,
+    _columns=None, _cache=None, _circular_depth=0, _acyclic=frozenset(),
     # HACK: hand-optimized bytecode; turn globals into locals
     ValueError=ValueError,
     dict=dict,
@@ -273,51 +436,77 @@ def _make_iterencode(
     tuple=tuple,
 ):
 
-    if _indent is not None and not isinstance(_indent, str):
-        _indent = ' ' * _indent
+    if _indent is not None:
+        if not isinstance(_indent, str):
+            _indent = ' ' * _indent
+        _indents = Indentation(_indent, _item_separator)
+    else:
+        _indents = None
+    _containers = {dict, list, tuple}
+    _atoms = {int: int.__repr__, float: _floatstr, str: _encoder}
+
+    def _fused(chunks, opening, closing, _current_indent_level):
+        # Members of one atomic type are joined into a single chunk.
+        if _indents is None:
+            return opening + _item_separator.join(chunks) + closing
+        newline_indent, separator = _indents[_current_indent_level + 1]
+        return ''.join((
+            opening, newline_indent, separator.join(chunks),
+            _indents[_current_indent_level][0], closing
+        ))
 
     def _iterencode_list(lst, _current_indent_level):
         if not lst:
             yield '[]'
             return
-        if markers is not None:
+        if _columns is not None:
+            batch = _columns(lst)
+            if batch is not None:
+                yield from _iterencode(batch, _current_indent_level)
+                return
+        _atomstr = _atoms.get(type(lst[0]))
+        if _atomstr is not None and len(set(map(type, lst))) == 1:
+            yield _fused(map(_atomstr, lst), '[', ']', _current_indent_level)
+            return
+        if markers is not None and _current_indent_level >= _circular_depth:
             markerid = id(lst)
             if markerid in markers:
                 raise ValueError("Circular reference detected")
             markers[markerid] = lst
+        else:
+            markerid = None
         buf = '['
-        if _indent is not None:
-            _current_indent_level += 1
-            newline_indent = '\n' + _indent * _current_indent_level
-            separator = _item_separator + newline_indent
+        _current_indent_level += 1
+        if _indents is not None:
+            newline_indent, separator = _indents[_current_indent_level]
             buf += newline_indent
         else:
             newline_indent = None
             separator = _item_separator
-        first = True
+        # Adjacent scalars are gathered into one chunk.
+        run = []
+        append = run.append
         for value in lst:
-            if first:
-                first = False
-            else:
-                buf = separator
             if isinstance(value, str):
-                yield buf + _encoder(value)
+                append(buf + _encoder(value))
             elif value is None:
-                yield buf + 'null'
+                append(buf + 'null')
             elif value is True:
-                yield buf + 'true'
+                append(buf + 'true')
             elif value is False:
-                yield buf + 'false'
+                append(buf + 'false')
             elif isinstance(value, int):
                 # Subclasses of int/float may override __str__, but we still
                 # want to encode them as integers/floats in JSON. One example
                 # within the standard library is IntEnum.
-                yield buf + str(int(value))
+                append(buf + str(int(value)))
             elif isinstance(value, float):
                 # see comment above for int
-                yield buf + _floatstr(float(value))
+                append(buf + _floatstr(float(value)))
             else:
-                yield buf
+                append(buf)
+                yield ''.join(run)
+                run.clear()
                 if isinstance(value, list):
                     chunks = _iterencode_list(value, _current_indent_level)
                 elif type(value) is tuple:
@@ -327,28 +516,43 @@ def _make_iterencode(
                 else:
                     chunks = _iterencode(value, _current_indent_level)
                 yield from chunks
+            buf = separator
         if newline_indent is not None:
             _current_indent_level -= 1
-            yield '\n' + _indent * _current_indent_level
-        yield ']'
-        if markers is not None:
+            append(_indents[_current_indent_level][0])
+        append(']')
+        yield ''.join(run)
+        if markerid is not None:
             del markers[markerid]
 
     def _iterencode_dict(dct, _current_indent_level):
         if not dct:
             yield '{}'
             return
-        if markers is not None:
+        _atomstr = _atoms.get(type(next(iter(dct.values()))))
+        if (
+            _atomstr is not None and
+            len(set(map(type, dct.values()))) == 1 and set(map(type, dct)) == {str}
+        ):
+            items = sorted(dct.items(), key=lambda kv: kv[0]) if _sort_keys else dct.items()
+            yield _fused(
+                [_encoder(k) + _key_separator + _atomstr(v) for k, v in items],
+                '{', '}', _current_indent_level
+            )
+            return
+        if markers is not None and _current_indent_level >= _circular_depth:
             markerid = id(dct)
             if markerid in markers:
                 raise ValueError("Circular reference detected")
             markers[markerid] = dct
-        yield '{'
-        if _indent is not None:
-            _current_indent_level += 1
-            newline_indent = '\n' + _indent * _current_indent_level
-            item_separator = _item_separator + newline_indent
-            yield newline_indent
+        else:
+            markerid = None
+        run = ['{']
+        append = run.append
+        _current_indent_level += 1
+        if _indents is not None:
+            newline_indent, item_separator = _indents[_current_indent_level]
+            append(newline_indent)
         else:
             newline_indent = None
             item_separator = _item_separator
@@ -381,24 +585,26 @@ def _make_iterencode(
             if first:
                 first = False
             else:
-                yield item_separator
-            yield _encoder(key)
-            yield _key_separator
+                append(item_separator)
+            append(_encoder(key))
+            append(_key_separator)
             if isinstance(value, str):
-                yield _encoder(value)
+                append(_encoder(value))
             elif value is None:
-                yield 'null'
+                append('null')
             elif value is True:
-                yield 'true'
+                append('true')
             elif value is False:
-                yield 'false'
+                append('false')
             elif isinstance(value, int):
                 # see comment for int/float in _make_iterencode
-                yield str(int(value))
+                append(str(int(value)))
             elif isinstance(value, float):
                 # see comment for int/float in _make_iterencode
-                yield _floatstr(float(value))
+                append(_floatstr(float(value)))
             else:
+                yield ''.join(run)
+                run.clear()
                 if isinstance(value, list):
                     chunks = _iterencode_list(value, _current_indent_level)
                 elif type(value) is tuple:  # Turberfield deals with namedtuples
@@ -410,9 +616,10 @@ def _make_iterencode(
                 yield from chunks
         if newline_indent is not None:
             _current_indent_level -= 1
-            yield '\n' + _indent * _current_indent_level
-        yield '}'
-        if markers is not None:
+            append(_indents[_current_indent_level][0])
+        append('}')
+        yield ''.join(run)
+        if markerid is not None:
             del markers[markerid]
 
     def _iterencode(o, _current_indent_level):
@@ -436,14 +643,141 @@ def _make_iterencode(
             yield from _iterencode_list(o, _current_indent_level)
         elif type(o) is dict:
             yield from _iterencode_dict(o, _current_indent_level)
+        else:
+            cacheable = _cache is not None and _cache.eligible(o)
+            if cacheable:
+                # Compact output is the same at any depth.
+                level = _current_indent_level if _indents is not None else 0
+                fragment = _cache.get(o, level)
+                if fragment is not None:
+                    yield fragment
+                    return
+            markerid = None
+            if _unchecked is not None and type(o) in _acyclic:
+                # The type is declared to be tree-shaped.
+                encode = _unchecked
+                rv = _default(o)
+            else:
+                encode = _iterencode
+                rv = _default(o)
+                # A default which returns no container leaves the depth
+                # unchanged, so is always checked.
+                if markers is not None and (
+                    _current_indent_level >= _circular_depth or
+                    type(rv) not in _containers
+                ):
+                    markerid = id(o)
+                    if markerid in markers:
+                        raise ValueError("Circular reference detected")
+                    markers[markerid] = o
+            if cacheable:
+                fragment = ''.join(encode(rv, _current_indent_level))
+                _cache.put(o, level, fragment)
+                yield fragment
+            else:
+                yield from encode(rv, _current_indent_level)
+            if markerid is not None:
+                del markers[markerid]
+
+    if markers is not None and _acyclic:
+        _unchecked = _make_iterencode(
+            None, _default, _encoder, _indent, _floatstr,
+            _key_separator, _item_separator, _sort_keys, _skipkeys, _one_shot,
+            _columns, _cache
+        )
+    else:
+        _unchecked = None
+    return _iterencode
+
+
+def _make_resolve(
+    markers, _default, _skipkeys, _columns=None,
+    # HACK: hand-optimized bytecode; turn globals into locals
+    ValueError=ValueError,
+    dict=dict,
+    float=float,
+    id=id,
+    int=int,
+    isinstance=isinstance,
+    list=list,
+    str=str,
+    tuple=tuple,
+):
+    """Return a function which prepares an object for the C encoder.
+
+    The C encoder inlines every subclass of tuple and dict. This encoder
+    passes those to `default` instead, so they are replaced here by
+    what `default` makes of them. Containers are copied only when
+    something inside them has changed.
+
+    """
+    _atoms = {str, int, float, bool, type(None)}
+
+    def _resolve_list(lst):
+        if _atoms.issuperset(map(type, lst)):
+            return lst
+        if _columns is not None:
+            batch = _columns(lst)
+            if batch is not None:
+                return _resolve(batch)
+        if markers is not None:
+            markerid = id(lst)
+            if markerid in markers:
+                raise ValueError("Circular reference detected")
+            markers[markerid] = lst
+        rv = None
+        for n, value in enumerate(lst):
+            if type(value) in _atoms:
+                continue
+            item = _resolve(value)
+            if item is not value:
+                if rv is None:
+                    rv = list(lst)
+                rv[n] = item
+        if markers is not None:
+            del markers[markerid]
+        return lst if rv is None else rv
+
+    def _resolve_dict(dct):
+        if markers is not None:
+            markerid = id(dct)
+            if markerid in markers:
+                raise ValueError("Circular reference detected")
+            markers[markerid] = dct
+        rv = None
+        for key, value in dct.items():
+            if not isinstance(key, (str, int, float)) and key is not None:
+                if _skipkeys:
+                    continue
+                raise TypeError("key " + repr(key) + " is not a string")
+            if type(value) in _atoms:
+                continue
+            item = _resolve(value)
+            if item is not value:
+                if rv is None:
+                    rv = dict(dct)
+                rv[key] = item
+        if markers is not None:
+            del markers[markerid]
+        return dct if rv is None else rv
+
+    def _resolve(o):
+        if type(o) is dict:
+            return _resolve_dict(o)
+        elif isinstance(o, (str, int, float)) or o is None:
+            return o
+        elif isinstance(o, list):
+            return _resolve_list(o)
+        elif type(o) is tuple:
+            return _resolve_list(o)
         else:
             if markers is not None:
                 markerid = id(o)
                 if markerid in markers:
                     raise ValueError("Circular reference detected")
                 markers[markerid] = o
-            o = _default(o)
-            yield from _iterencode(o, _current_indent_level)
+            o = _resolve(_default(o))
             if markers is not None:
                 del markers[markerid]
-    return _iterencode
+            return o
+    return _resolve
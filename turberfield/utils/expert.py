@@ -16,14 +16,25 @@
 # You should have received a copy of the GNU General Public License
 # along with turberfield.  If not, see <http://www.gnu.org/licenses/>.
 
+import array
 import asyncio
 from collections import defaultdict
 from collections import namedtuple
+from collections import OrderedDict
+import collections.abc
+import concurrent.futures
 import contextlib
+from decimal import Decimal
+import functools
 import itertools
+import json
 import logging
+import mmap
+import multiprocessing
 import os
+import re
 import tempfile
+import threading
 import time
 import warnings
 
@@ -67,6 +78,15 @@ value of a key shows the way the attribute will be published, as follows:
    :annotation: (name, attr, dst). A sequence of items in
         RSON format, publicly readable as a local file.
 
+.. autoattribute:: turberfield.utils.expert.Expert.Queues
+   :annotation: (name). A public attribute which lists the depth,
+        bound and dropped messages of each input queue.
+
+.. autoattribute:: turberfield.utils.expert.Expert.Metrics
+   :annotation: (name, dst). A JSON-formatted web page of the figures
+        recorded by the :py:class:`Instruments <turberfield.utils.expert.Instruments>`
+        of the class, declared at most once per interval.
+
 Instantiation
 -------------
 
@@ -85,6 +105,16 @@ for messages you pass into them.
     wiring = (asyncio.Queue(), PipeQueue.pipequeue("/tmp/pq.fifo"))
     expert = SomeExpertSubclass(*wiring, **options)
 
+Bound those queues to stop a fast producer from exhausting memory. A
+producer to an `asyncio.Queue` with a `maxsize` waits on `put` for
+space. A :py:class:`PipeQueue <turberfield.utils.pipes.PipeQueue>` may
+also stop reading from its pipe, or drop messages, when full::
+
+    wiring = (
+        asyncio.Queue(maxsize=1000),
+        PipeQueue.pipequeue("/tmp/pq.fifo", maxsize=1000, policy="drop")
+    )
+
 Invocation
 ----------
 
@@ -118,6 +148,397 @@ For example, should `SomeExpertSubclass` define an
 """
 
 
+class PageReader(collections.abc.Sequence):
+    """
+    Gives random access to the items of an RSON or HATEOAS declaration
+    without parsing the whole file. The file is memory-mapped, and an
+    item is decoded only when you ask for it::
+
+        with PageReader("/var/experts/page.json") as reader:
+            ts = reader.info["ts"]
+            latest = reader[-1]
+
+    Item offsets are taken from the sidecar file saved by an
+    :py:class:`Expert <turberfield.utils.expert.Expert>` whose class
+    attribute `indexed` is True. Should that be missing or out of date,
+    the file is scanned instead.
+
+    A page written by an Expert whose class attribute `columnar` is True
+    may hold its items as one batch of columns. There is no item there to
+    read alone, so the reader raises a ValueError. Decode such a page
+    whole, with :py:meth:`Assembly.loads <turberfield.utils.assembly.Assembly.loads>`.
+
+    """
+
+    head = b'{\n    "info": '
+    items = b'\n    "items": ['
+    batch = b'\n    "items": {'
+    starts = re.compile(rb"[\[,]\n {8}(?=\S)")
+
+    @staticmethod
+    def scan(buf):
+        """
+        Return the offsets of the items in a HATEOAS page, followed by
+        the offset of their end, or None if the page has no item array.
+
+        """
+        pos = buf.find(PageReader.items)
+        if pos == -1:
+            return None
+        pos += len(PageReader.items)
+        if buf[pos:pos + 1] == b"]":
+            return [pos]
+        end = buf.find(b"\n    ]", pos)
+        rv = [m.end() for m in PageReader.starts.finditer(buf, pos - 1, end)]
+        rv.append(end)
+        return rv
+
+    def __init__(self, path, parse_float=Decimal):
+        self.path = path
+        self.decoder = Assembly.decoder(parse_float=parse_float)
+        self.fObj = open(path, "rb")
+        stat = os.fstat(self.fObj.fileno())
+        if stat.st_size:
+            self.buf = mmap.mmap(self.fObj.fileno(), 0, access=mmap.ACCESS_READ)
+        else:
+            self.buf = b""
+        self.offsets = self.load(stat) or self.build()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+        return False
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, n):
+        if isinstance(n, slice):
+            return [self[i] for i in range(*n.indices(len(self)))]
+        n = range(len(self))[n]
+        text = self.buf[self.offsets[n]:self.offsets[n + 1]].decode("utf-8")
+        return self.decoder.decode(text.strip().rstrip(","))
+
+    @property
+    def info(self):
+        """
+        The `info` object of a HATEOAS page, decoded on its own.
+
+        """
+        if self.buf[:len(PageReader.head)] != PageReader.head:
+            return None
+        end = self.buf.find(PageReader.items)
+        text = self.buf[len(PageReader.head):end].decode("utf-8")
+        return self.decoder.raw_decode(text)[0]
+
+    def close(self):
+        if isinstance(self.buf, mmap.mmap):
+            self.buf.close()
+        self.fObj.close()
+
+    def load(self, stat):
+        try:
+            data = array.array("Q")
+            with open(self.path + ".idx", "rb") as index:
+                data.frombytes(index.read())
+        except (OSError, ValueError):
+            return None
+        if list(data[:2]) != [stat.st_size, stat.st_mtime_ns] or len(data) < 3:
+            return None
+        return data[2:]
+
+    def build(self):
+        if self.buf[:len(PageReader.head)] == PageReader.head:
+            rv = PageReader.scan(self.buf)
+            if rv is None and self.buf.find(PageReader.batch) != -1:
+                raise ValueError("Columnar items in {0} can't be read singly".format(self.path))
+            elif rv is None:
+                raise ValueError("No array of items in {0}".format(self.path))
+            return rv
+
+        # RSON records can only be found by decoding them.
+        # Latin-1 keeps one character per byte.
+        text = self.buf[:].decode("latin-1")
+        rv = []
+        pos = Assembly.whitespace.match(text, 0).end()
+        while pos < len(text):
+            rv.append(pos)
+            obj, pos = json.JSONDecoder().raw_decode(text, pos)
+            pos = Assembly.whitespace.match(text, pos).end()
+        rv.append(len(text))
+        return rv
+
+
+class Writer:
+    """
+    A single thread which writes declarations in the order they are
+    submitted. A job submitted for a destination which is still waiting
+    replaces the earlier one, so only the latest declaration is written.
+
+    """
+
+    def __init__(self, name="turberfield.expert.writer"):
+        self._log = logging.getLogger(name)
+        self.jobs = OrderedDict()
+        self.busy = False
+        self.closed = False
+        self.condition = threading.Condition()
+        self.thread = threading.Thread(target=self.run, name=name, daemon=True)
+        self.thread.start()
+
+    @property
+    def outstanding(self):
+        """The number of writes waiting or in progress."""
+        with self.condition:
+            return len(self.jobs) + int(self.busy)
+
+    def submit(self, dst, job):
+        with self.condition:
+            if self.closed:
+                raise RuntimeError("Writer is closed")
+            self.jobs[dst] = job
+            self.condition.notify_all()
+
+    def flush(self, timeout=None):
+        """
+        Wait until all submitted writes are done. Returns False if the
+        timeout expired first.
+
+        """
+        with self.condition:
+            return self.condition.wait_for(
+                lambda: not (self.jobs or self.busy), timeout=timeout
+            )
+
+    def close(self):
+        """
+        Write what is outstanding, then stop the thread.
+
+        """
+        with self.condition:
+            self.closed = True
+            self.condition.notify_all()
+        self.thread.join()
+
+    def run(self):
+        while True:
+            with self.condition:
+                self.condition.wait_for(lambda: self.jobs or self.closed)
+                if not self.jobs:
+                    return
+                dst, job = self.jobs.popitem(last=False)
+                self.busy = True
+            try:
+                job()
+            except Exception:
+                self._log.exception("Failed to write {0}".format(dst))
+            finally:
+                with self.condition:
+                    self.busy = False
+                    self.condition.notify_all()
+
+
+class Instruments:
+    """
+    :param interval: the least number of seconds between declarations
+                     of a :py:class:`Metrics <turberfield.utils.expert.Expert.Metrics>`
+                     page.
+
+    Counters and latency histograms for an Expert class. Set an object of
+    this class as the class attribute `instruments` of an Expert subclass
+    before creating the Expert::
+
+        SomeExpertSubclass.instruments = Instruments()
+
+    The Expert then records:
+
+    * the number of messages taken from its queues, and the time it
+      waits for each (``wait``).
+    * the time it is busy in each step of
+      :py:meth:`watch <turberfield.utils.expert.Expert.watch>`, but not
+      while suspended (``watch``).
+    * the duration of each call to
+      :py:meth:`declare <turberfield.utils.expert.Expert.declare>`
+      (``declare``) and of each file it writes (``write``).
+    * the bytes written to each destination.
+
+    The coroutine returned by calling the Expert is not wrapped for you.
+    Wrap it yourself to measure it as ``call``::
+
+        task = asyncio.Task(instruments.busy("call", expert(loop=loop)))
+
+    Nothing is wrapped when `instruments` is None, which is the default.
+
+    The figures are returned by
+    :py:meth:`snapshot <turberfield.utils.expert.Instruments.snapshot>`.
+    Its keys can also be used in the frame of a
+    :py:class:`Logger <turberfield.utils.logger.Logger>`::
+
+        logger.frame += ["{counters[messages]}", "{latency[declare][total]:.3f}"]
+        logger.note("Metrics", **instruments.snapshot())
+
+    """
+
+    buckets = 32
+
+    def __init__(self, interval=10):
+        self.interval = interval
+        self.exported = None
+        self.counters = defaultdict(int)
+        self.totals = defaultdict(float)
+        self.histograms = defaultdict(lambda: array.array("Q", bytes(8 * self.buckets)))
+        self.written = defaultdict(int)
+        self.lock = threading.Lock()
+
+    def count(self, name, n=1):
+        with self.lock:
+            self.counters[name] += n
+
+    def record(self, name, seconds):
+        """
+        Record a duration of `seconds` against `name`. The histogram of
+        each name counts durations in bins of powers of two microseconds.
+
+        """
+        n = min(int(seconds * 1e6).bit_length(), self.buckets - 1)
+        with self.lock:
+            self.histograms[name][n] += 1
+            self.totals[name] += seconds
+
+    def timed(self, name, func):
+        """
+        Return a wrapper for `func` which records the duration of each
+        call.
+
+        """
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                self.record(name, time.perf_counter() - start)
+        return wrapper
+
+    def job(self, dst, job):
+        """
+        Return a wrapper for a `job` which writes to `dst`. It records
+        the duration of the job and the bytes it adds to the file.
+
+        """
+        def wrapper():
+            try:
+                prior = os.stat(dst)
+            except (OSError, TypeError):
+                prior = None
+            start = time.perf_counter()
+            try:
+                return job()
+            finally:
+                self.record("write", time.perf_counter() - start)
+                try:
+                    stat = os.stat(dst)
+                except (OSError, TypeError):
+                    pass
+                else:
+                    if prior is None or prior.st_ino != stat.st_ino:
+                        n = stat.st_size
+                    else:
+                        n = max(stat.st_size - prior.st_size, 0)
+                    with self.lock:
+                        self.written[dst] += n
+        return wrapper
+
+    @asyncio.coroutine
+    def busy(self, name, coro):
+        """
+        A coroutine which runs `coro`, recording the duration of each
+        step it takes between suspensions.
+
+        """
+        send, value = coro.send, None
+        while True:
+            start = time.perf_counter()
+            try:
+                step = send(value)
+            except StopIteration as e:
+                return e.value
+            finally:
+                self.record(name, time.perf_counter() - start)
+
+            try:
+                value = yield step
+            except BaseException as e:
+                send, value = coro.throw, e
+            else:
+                send = coro.send
+
+    def probe(self, q):
+        """
+        Return a proxy for the queue `q` which counts the messages taken
+        from it and records the time spent waiting for them.
+
+        """
+        return Instruments.Probe(q, self)
+
+    def due(self):
+        """
+        Return True if `interval` seconds have passed since it last did.
+
+        """
+        now = time.monotonic()
+        if self.exported is None or now - self.exported >= self.interval:
+            self.exported = now
+            return True
+        return False
+
+    def snapshot(self):
+        """
+        Return the figures recorded so far as a dictionary which may be
+        encoded as JSON.
+
+        """
+        with self.lock:
+            return {
+                "counters": dict(self.counters),
+                "latency": {
+                    k: {
+                        "count": sum(v),
+                        "total": self.totals[k],
+                        "histogram": v.tolist()
+                    }
+                    for k, v in self.histograms.items()
+                },
+                "written": dict(self.written),
+            }
+
+    class Probe:
+
+        def __init__(self, q, instruments):
+            self.q = q
+            self.instruments = instruments
+
+        def __getattr__(self, name):
+            return getattr(self.q, name)
+
+        @asyncio.coroutine
+        def get(self):
+            start = time.perf_counter()
+            msg = yield from self.q.get()
+            self.instruments.record("wait", time.perf_counter() - start)
+            if msg is not None:
+                self.instruments.count("messages")
+            return msg
+
+        def get_nowait(self):
+            msg = self.q.get_nowait()
+            if msg is not None:
+                self.instruments.count("messages")
+            return msg
+
+
 class Expert:
     """
     A base class for *Information Experts*.
@@ -127,14 +548,38 @@ class Expert:
     Event = namedtuple("Event", ["name"])
     HATEOAS = namedtuple("HATEOAS", ["name", "attr", "dst"])
     JSON = namedtuple("JSON", ["name"])
+    Metrics = namedtuple("Metrics", ["name", "dst"])
     Page = namedtuple("Page", ["info", "nav", "items", "options"])
+    Queues = namedtuple("Queues", ["name"])
     RSON = namedtuple("RSON", ["name", "attr", "dst"])
 
+    batch_deadline = 0
+    batch_size = 0
+    columnar = False
+    incremental = False
+    indexed = False
+    instruments = None
     public = None
+    sequence = 0
+    stamps = {}
+    waiters = []
+    writer = None
 
     @staticmethod
     @contextlib.contextmanager
-    def declaration(arg, suffix=".json"):
+    def declaration(arg, suffix=".json", index=None):
+        """
+        Open a file at the path `arg` for a declaration, which replaces
+        any previous one when the context exits. If `arg` is not a path,
+        it is taken to be a file object.
+
+        If `index` is a list, then by the time the context exits it should
+        hold the byte offsets of the declared items, followed by the
+        offset of their end. These are saved in a sidecar file for
+        :py:class:`PageReader <turberfield.utils.expert.PageReader>`.
+        Nothing is saved if the list is left empty.
+
+        """
         if isinstance(arg, str):
             parent = os.path.dirname(arg)
             fD, fN = tempfile.mkstemp(suffix=suffix, dir=parent)
@@ -146,9 +591,54 @@ class Expert:
             rv.close()
             os.close(fD)
             os.replace(fN, arg)
+            if index:
+                Expert.index(arg, index)
         else:
             yield arg
 
+    @staticmethod
+    def index(path, offsets):
+        """
+        Save the item `offsets` of the declaration at `path` to its
+        sidecar file.
+
+        """
+        stat = os.stat(path)
+        data = array.array("Q", [stat.st_size, stat.st_mtime_ns])
+        data.extend(offsets)
+        fD, fN = tempfile.mkstemp(suffix=".idx", dir=os.path.dirname(path))
+        with open(fD, "wb") as output:
+            data.tofile(output)
+        os.replace(fN, path + ".idx")
+
+    @staticmethod
+    def rson(items, output, offset=0):
+        """
+        Write `items` to `output` in RSON format. Returns the offsets
+        of each item and of their end, counting from `offset`.
+
+        """
+        rv = [offset]
+        for i in items:
+            text = Assembly.dumps(i, indent=0) + "\n"
+            output.write(text)
+            offset += len(text)
+            rv.append(offset)
+        return rv
+
+    @staticmethod
+    def measure(q):
+        """
+        Return a dictionary of metrics for the queue `q`.
+
+        """
+        try:
+            return q.metrics
+        except AttributeError:
+            return {
+                "qsize": q.qsize(), "maxsize": q.maxsize, "dropped": 0, "paused": False
+            }
+
     @staticmethod
     def options():
         """
@@ -197,11 +687,27 @@ class Expert:
             if isinstance(i, (asyncio.Queue, PipeQueue))
             # TODO: accept JobQueue, via hasattr duck typing?
         ]
-        self._watchers = [
-            asyncio.Task(self.watch(q, loop=loop), loop=loop)
-            for q in inputs
-        ]
+        watch = self.watch_batch if class_.batch_size else self.watch
+        instruments = class_.instruments
+        self._inputs = inputs
+        if instruments is None:
+            self._watchers = [
+                asyncio.Task(watch(q, loop=loop), loop=loop)
+                for q in inputs
+            ]
+        else:
+            submit = self.submit
+            self.declare = instruments.timed("declare", self.declare)
+            self.submit = lambda dst, job: submit(dst, instruments.job(dst, job))
+            self._watchers = [
+                asyncio.Task(
+                    instruments.busy("watch", watch(instruments.probe(q), loop=loop)),
+                    loop=loop
+                )
+                for q in inputs
+            ]
         self._services = kwargs
+        self._digests = {}
         if kwargs:
             if class_.public is not None:
                 warnings.warn("Re-initialisation of {}: {}".format(
@@ -209,13 +715,16 @@ class Expert:
 
             attributes = [
                 k for k, v in kwargs.items()
-                if isinstance(v, (Expert.Attribute, Expert.Event))
+                if isinstance(v, (Expert.Attribute, Expert.Event, Expert.Queues))
             ]
             self.Interface = namedtuple(
                 class_.__name__ + "Interface", attributes)
 
             class_.public = self.Interface._make(
                 itertools.repeat(None, len(attributes)))
+            class_.stamps = dict.fromkeys(attributes, class_.sequence)
+            if "waiters" not in vars(class_):
+                class_.waiters = []
 
     @asyncio.coroutine
     def __call__(self, loop=None):
@@ -252,36 +761,246 @@ class Expert:
         +-------------------------------------------------------------------+-------------------------------------------------------------------+
         | :py:class:`RSON <turberfield.utils.expert.Expert.RSON>`           | ``RSON.dst`` is the file path to the data in RSON format.         |
         +-------------------------------------------------------------------+-------------------------------------------------------------------+
+        | :py:class:`Queues <turberfield.utils.expert.Expert.Queues>`       | ``<Subclass>.public.<name>`` lists metrics of the input queues.   |
+        +-------------------------------------------------------------------+-------------------------------------------------------------------+
         | :py:class:`HATEOAS <turberfield.utils.expert.Expert.HATEOAS>`     | ``HATEOAS.dst`` is the file path to the data as a JSON web page.  |
         +-------------------------------------------------------------------+-------------------------------------------------------------------+
+        | :py:class:`Metrics <turberfield.utils.expert.Expert.Metrics>`     | ``Metrics.dst`` is the file path to the figures of `instruments`. |
+        +-------------------------------------------------------------------+-------------------------------------------------------------------+
+
+        Each call which alters a public attribute advances the sequence
+        number of the class. Consumers may wait for that with
+        :py:meth:`changed <turberfield.utils.expert.Expert.changed>`
+        rather than polling ``public``. A mutable value declared again
+        as the same object counts as altered, since it may have been
+        changed in place.
+
+        Subclasses which set the class attribute `columnar` to True write
+        lists of registered objects in HATEOAS pages column by column.
+        They are read back as an
+        :py:class:`Assembly.Batch <turberfield.utils.assembly.Assembly.Batch>`.
+        A :py:class:`PageReader <turberfield.utils.expert.PageReader>`
+        can't read such pages, and no index is saved for them.
+
+        Subclasses which set the class attribute `indexed` to True save
+        the offsets of declared items alongside each file, for use by a
+        :py:class:`PageReader <turberfield.utils.expert.PageReader>`.
+
+        Subclasses which set the class attribute `writer` to a
+        :py:class:`Writer <turberfield.utils.expert.Writer>` have their
+        files written by it, off the event loop. Items must not be
+        altered once declared.
+
+        Subclasses which set the class attribute `incremental` to True
+        keep a digest of what they last declared to each file path.
+        An RSON file is appended to when the new items extend those
+        previously declared, and rewritten whole otherwise. A HATEOAS
+        page is rewritten only when its content changes; its timestamp
+        then records the time of that change.
+
+        Subclasses which set the class attribute `instruments` to an
+        :py:class:`Instruments <turberfield.utils.expert.Instruments>`
+        object have the time spent here and in writing files recorded by
+        it.
         """  # noqa: E501
         class_ = self.__class__
         kwargs = defaultdict(None)
+        changes = []
         for name, service in self._services.items():
-            if isinstance(service, Expert.Attribute):
-                kwargs[service.name] = data[service.name]
+            if isinstance(service, (Expert.Attribute, Expert.Queues)):
+                if isinstance(service, Expert.Queues):
+                    value = [Expert.measure(q) for q in self._inputs]
+                else:
+                    value = data[service.name]
+                kwargs[service.name] = value
+                prior = getattr(class_.public, service.name)
+                if prior is value:
+                    # The same object again; it may have been changed in place.
+                    differs = not isinstance(value, collections.abc.Hashable)
+                else:
+                    try:
+                        differs = bool(prior != value)
+                    except Exception:
+                        differs = True
+                if differs:
+                    changes.append(service.name)
             elif isinstance(service, Expert.Event):
                 event = kwargs[service.name] = (
                     getattr(class_.public, service.name) or
                     asyncio.Event(loop=loop)
                 )
+                state = event.is_set()
                 if data[service.name]:
                     event.set()
                 else:
                     event.clear()
+                if event.is_set() != state or getattr(class_.public, service.name) is None:
+                    changes.append(service.name)
             elif isinstance(service, Expert.RSON):
-                with Expert.declaration(service.dst) as output:
-                    for i in data.get(service.attr, []):
-                        Assembly.dump(i, output, indent=0)
-                        output.write("\n")
+                items = list(data.get(service.attr, []))
+                self.submit(
+                    service.dst, functools.partial(self.records, name, service.dst, items)
+                )
             elif isinstance(service, Expert.HATEOAS):
                 page = class_.page()
-                page.info["ts"] = time.time()
                 page.items[:] = data.get(service.attr, [])
-                with Expert.declaration(service.dst) as output:
-                    Assembly.dump(vars(page), output, indent=4)
+                self.submit(
+                    service.dst, functools.partial(self.publish, name, service.dst, page)
+                )
+            elif isinstance(service, Expert.Metrics):
+                instruments = class_.instruments
+                if instruments is not None and instruments.due():
+                    page = class_.page()
+                    page.items[:] = [instruments.snapshot()]
+                    self.submit(
+                        service.dst, functools.partial(self.publish, name, service.dst, page)
+                    )
 
         class_.public = class_.public._replace(**kwargs)
+        if changes:
+            class_.stamp(changes)
+
+    @classmethod
+    def stamp(cls, names):
+        """
+        Advance the sequence number of the class, record it against the
+        public attributes `names`, and wake those waiting on them.
+
+        """
+        if "stamps" not in vars(cls):
+            cls.stamps = {}
+        cls.sequence += 1
+        for name in names:
+            cls.stamps[name] = cls.sequence
+        for waiter in list(cls.waiters):
+            names, since, future = waiter
+            if not future.done() and cls.modified(since, names):
+                future.set_result(cls.sequence)
+                cls.waiters.remove(waiter)
+
+    @classmethod
+    def modified(cls, since=0, names=None):
+        """
+        Return True if any of the public attributes `names` (or any at
+        all if `names` is None) has changed since the sequence number
+        `since`.
+
+        """
+        if names is None:
+            return cls.sequence > since
+        return any(cls.stamps.get(i, 0) > since for i in names)
+
+    @classmethod
+    @asyncio.coroutine
+    def changed(cls, since=0, names=None, loop=None):
+        """
+        A coroutine which waits until any of the public attributes
+        `names` (or any at all if `names` is None) has changed since the
+        sequence number `since`. It returns the sequence number of the
+        change, for use in the next call::
+
+            seq = 0
+            while True:
+                seq = yield from SomeExpertSubclass.changed(seq, ["tick"])
+                tick = SomeExpertSubclass.public.tick
+
+        """
+        if cls.modified(since, names):
+            return cls.sequence
+
+        future = (loop or asyncio.get_event_loop()).create_future()
+        waiter = (None if names is None else frozenset(names), since, future)
+        if "waiters" not in vars(cls):
+            # Subscribed before any instance was made.
+            cls.waiters = []
+        cls.waiters.append(waiter)
+        try:
+            return (yield from future)
+        finally:
+            if waiter in cls.waiters:
+                cls.waiters.remove(waiter)
+
+    def submit(self, dst, job):
+        """
+        Perform the `job` which writes to `dst`, via the class writer if
+        there is one.
+
+        """
+        writer = self.__class__.writer
+        if writer is not None and isinstance(dst, str):
+            writer.submit(dst, job)
+        else:
+            job()
+
+    def records(self, name, dst, items):
+        """
+        Write `items` in RSON format to `dst`.
+
+        """
+        class_ = self.__class__
+        if class_.incremental and isinstance(dst, str):
+            self.revise(name, dst, items)
+        else:
+            index = [] if class_.indexed else None
+            with Expert.declaration(dst, index=index) as output:
+                offsets = Expert.rson(items, output)
+                if index is not None:
+                    index.extend(offsets)
+
+    def publish(self, name, dst, page):
+        """
+        Write `page` as JSON to `dst`.
+
+        """
+        class_ = self.__class__
+        if class_.incremental and isinstance(dst, str):
+            # Keys are hashed in the order written; they need not be sortable.
+            digest = Assembly.digest(dict(page._asdict()), sort_keys=False)
+            if self._digests.get(name) == digest and os.path.isfile(dst):
+                return
+            self._digests[name] = digest
+        page.info["ts"] = time.time()
+        index = [] if class_.indexed and isinstance(dst, str) else None
+        with Expert.declaration(dst, index=index) as output:
+            Assembly.dump(dict(page._asdict()), output, indent=4, columnar=class_.columnar)
+            if index is not None:
+                output.flush()
+                with open(output.name, "rb") as fObj, mmap.mmap(
+                    fObj.fileno(), 0, access=mmap.ACCESS_READ
+                ) as buf:
+                    offsets = PageReader.scan(buf)
+                # A columnar batch has no items to index.
+                index.extend(offsets or [])
+
+    def revise(self, name, path, items):
+        """
+        Bring the RSON file at `path` up to date with `items`, appending
+        to it if the items last declared under `name` are unchanged and
+        the file is as it was left.
+
+        """
+        indexed = self.__class__.indexed
+        digests = [Assembly.digest(i, sort_keys=False) for i in items]
+        prior, size, offsets = self._digests.get(name, (None, None, None))
+        try:
+            current = os.path.getsize(path)
+        except OSError:
+            current = None
+
+        if prior is not None and current == size and digests[:len(prior)] == prior:
+            if len(digests) == len(prior):
+                return
+            with open(path, 'a') as output:
+                offsets = offsets[:-1] + Expert.rson(items[len(prior):], output, offsets[-1])
+            if indexed:
+                Expert.index(path, offsets)
+        else:
+            index = [] if indexed else None
+            with Expert.declaration(path, index=index) as output:
+                offsets = Expert.rson(items, output)
+                if index is not None:
+                    index.extend(offsets)
+        self._digests[name] = (digests, os.path.getsize(path), offsets)
 
     @asyncio.coroutine
     def watch(self, q, **kwargs):
@@ -297,3 +1016,311 @@ class Expert:
         msg = object()
         while msg is not None:
             msg = yield from q.get()
+
+    @asyncio.coroutine
+    def watch_batch(self, q, **kwargs):
+        """
+        Subclasses may override the base class implementation.
+
+        This method is used in place of
+        :py:meth:`watch <turberfield.utils.expert.Expert.watch>` when
+        the class attribute `batch_size` is non-zero. It takes from the
+        queue as many as `batch_size` messages, waiting up to
+        `batch_deadline` seconds after the first for more to arrive. The
+        messages are passed as a list to
+        :py:meth:`handle_batch <turberfield.utils.expert.Expert.handle_batch>`.
+
+        """
+        class_ = self.__class__
+        loop = kwargs.pop("loop", None) or asyncio.get_event_loop()
+        while True:
+            batch = [(yield from q.get())]
+            deadline = loop.time() + class_.batch_deadline
+            while batch[-1] is not None and len(batch) < class_.batch_size:
+                try:
+                    batch.append(q.get_nowait())
+                except asyncio.QueueEmpty:
+                    timeout = deadline - loop.time()
+                    if timeout <= 0:
+                        break
+                    try:
+                        batch.append((yield from asyncio.wait_for(q.get(), timeout)))
+                    except asyncio.TimeoutError:
+                        break
+
+            if batch[-1] is None:
+                if len(batch) > 1:
+                    yield from self.handle_batch(batch[:-1])
+                return
+            yield from self.handle_batch(batch)
+
+    @asyncio.coroutine
+    def handle_batch(self, batch):
+        """
+        Subclasses should override the base class implementation.
+
+        This coroutine is passed each list of messages taken from a queue
+        by :py:meth:`watch_batch <turberfield.utils.expert.Expert.watch_batch>`.
+
+        """
+        return None
+
+
+class Supervisor:
+    """
+    :param cls: an Expert subclass.
+    :param workers: the number of worker processes. Defaults to the
+                    number of CPUs.
+    :param key: a function which returns the shard key of a message.
+                By default this is the first element of a tuple, or
+                else the message itself.
+    :param options: keyword arguments for `cls`, generated by its
+                    :py:meth:`options <turberfield.utils.expert.Expert.options>`
+                    method.
+
+    Runs an Expert subclass in a pool of worker processes, so that CPU-heavy
+    experts need not share one event loop::
+
+        supervisor = Supervisor(SomeExpertSubclass, **options).start()
+        supervisor.put_nowait(("sensor-7", reading))
+        tick = yield from SomeExpertSubclass.changed(0, ["tick"])
+        supervisor.close()
+
+    Each message is sent to the worker chosen by its key, so all messages
+    with the same key go to the same worker. Each worker has its own
+    instance of `cls`, watching a single queue.
+
+    Whenever a worker declares changes, its public attributes are sent
+    back to the parent. There they are merged (see
+    :py:meth:`combine <turberfield.utils.expert.Supervisor.combine>`) into
+    ``cls.public``, which is versioned just as for an Expert in the
+    parent process.
+
+    An `asyncio.Event` belongs to the loop of its own process, so a worker
+    sends the state of each Event attribute as a boolean. By default the
+    parent's public value of that attribute is a list of booleans, one for
+    each worker. It is not an Event to wait on. Use
+    :py:meth:`changed <turberfield.utils.expert.Expert.changed>` instead.
+
+    Each worker writes its file-backed services (RSON, HATEOAS and
+    Metrics) to its own file. The worker's index is added to the name;
+    so ``items.rson`` becomes ``items-0.rson``, ``items-1.rson``, and so on.
+
+    A worker which exits before the Supervisor is closed is restarted.
+    Messages it had not handled are lost.
+
+    """
+
+    Worker = namedtuple("Worker", ["process", "inputs", "outputs"])
+
+    @staticmethod
+    def work(cls, options, inputs, outputs, inherited=()):
+        """
+        The main function of a worker process. Connections `inherited`
+        from the parent are closed, so that each worker sees the end of
+        its input when the parent closes it.
+
+        """
+        for conn in inherited:
+            conn.close()
+        loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+        q = asyncio.Queue()
+
+        def receive():
+            try:
+                msg = inputs.recv()
+            except (EOFError, OSError):
+                loop.remove_reader(inputs.fileno())
+                msg = None
+            q.put_nowait(msg)
+
+        def report():
+            # Events can't leave the worker's loop; only their state is sent.
+            outputs.send((cls.sequence, {
+                k: v.is_set() if isinstance(v, asyncio.Event) else v
+                for k, v in cls.public._asdict().items()
+            }))
+
+        @asyncio.coroutine
+        def reporter():
+            seq = cls.sequence
+            while True:
+                seq = yield from cls.changed(seq, loop=loop)
+                report()
+
+        cls.public = None
+        expert = cls(q, loop=loop, **options)
+        loop.add_reader(inputs.fileno(), receive)
+        tasks = [
+            asyncio.Task(expert(loop=loop), loop=loop),
+            asyncio.Task(reporter(), loop=loop)
+        ]
+        try:
+            loop.run_until_complete(asyncio.gather(*expert._watchers))
+        finally:
+            for task in tasks:
+                task.cancel()
+            loop.run_until_complete(asyncio.gather(*tasks, return_exceptions=True))
+            report()
+            outputs.close()
+            loop.close()
+
+    @staticmethod
+    def shard(msg):
+        if isinstance(msg, tuple) and msg:
+            return msg[0]
+        return msg
+
+    @staticmethod
+    def worker_options(options, n):
+        """
+        Return the keyword arguments for worker `n`. A service whose
+        destination is a file path gets a path of its own.
+
+        """
+        services = (Expert.HATEOAS, Expert.Metrics, Expert.RSON)
+        rv = OrderedDict()
+        for k, v in options.items():
+            if isinstance(v, services) and isinstance(v.dst, str):
+                root, ext = os.path.splitext(v.dst)
+                v = v._replace(dst="{0}-{1}{2}".format(root, n, ext))
+            rv[k] = v
+        return rv
+
+    def __init__(self, cls, workers=None, key=None, context=None, loop=None, **options):
+        self.cls = cls
+        self.key = key or Supervisor.shard
+        self.context = context or multiprocessing.get_context()
+        self.loop = loop or asyncio.get_event_loop()
+        self.options = options
+        self.closing = False
+        self.restarts = 0
+        self.workers = [None] * (workers or os.cpu_count() or 1)
+        self.views = [{} for i in self.workers]
+        self.executor = concurrent.futures.ThreadPoolExecutor(max_workers=1)
+        self._lock = threading.Lock()
+        self._log = logging.getLogger(
+            "turberfield.supervisor." + cls.__name__.lower())
+
+    def start(self):
+        """
+        Create the public interface of the Expert class and launch the
+        workers. Returns the Supervisor.
+
+        """
+        cls = self.cls
+        attributes = [
+            k for k, v in self.options.items()
+            if isinstance(v, (Expert.Attribute, Expert.Event, Expert.Queues))
+        ]
+        interface = namedtuple(cls.__name__ + "Interface", attributes)
+        cls.public = interface._make(itertools.repeat(None, len(attributes)))
+        cls.stamps = dict.fromkeys(attributes, cls.sequence)
+        if "waiters" not in vars(cls):
+            cls.waiters = []
+        for n in range(len(self.workers)):
+            self.launch(n)
+        return self
+
+    def launch(self, n):
+        inputs, sender = self.context.Pipe(duplex=False)
+        receiver, outputs = self.context.Pipe(duplex=False)
+        inherited = [
+            i.inputs for i in self.workers if i is not None and not i.inputs.closed
+        ] + [sender]
+        process = self.context.Process(
+            target=Supervisor.work,
+            args=(
+                self.cls, Supervisor.worker_options(self.options, n),
+                inputs, outputs, inherited
+            ),
+            daemon=True
+        )
+        process.start()
+        inputs.close()
+        outputs.close()
+        self.workers[n] = Supervisor.Worker(process, sender, receiver)
+        self.loop.add_reader(receiver.fileno(), self.receive, n)
+
+    def receive(self, n):
+        worker = self.workers[n]
+        try:
+            seq, view = worker.outputs.recv()
+        except (EOFError, OSError):
+            self.loop.remove_reader(worker.outputs.fileno())
+            worker.outputs.close()
+            worker.inputs.close()
+            worker.process.join()
+            if not self.closing:
+                self._log.warning("Restarting worker {0}".format(n))
+                self.restarts += 1
+                self.launch(n)
+            return
+        self.views[n] = view
+        self.merge()
+
+    def combine(self, name, values):
+        """
+        Subclasses may override the base class implementation.
+
+        Return the public value of the attribute `name`, given a list of
+        its `values` in each worker. By default the list itself.
+
+        """
+        return values
+
+    def merge(self):
+        cls = self.cls
+        kwargs = {}
+        for name in cls.public._fields:
+            value = self.combine(name, [i.get(name) for i in self.views])
+            if value != getattr(cls.public, name):
+                kwargs[name] = value
+        if kwargs:
+            cls.public = cls.public._replace(**kwargs)
+            cls.stamp(kwargs)
+
+    def put_nowait(self, msg):
+        """
+        Send a message to the worker chosen by its key. This blocks
+        while the pipe to that worker is full.
+
+        """
+        n = hash(self.key(msg)) % len(self.workers)
+        with self._lock:
+            self.workers[n].inputs.send(msg)
+
+    @asyncio.coroutine
+    def put(self, msg):
+        """
+        Send a message to the worker chosen by its key. The message is
+        sent from a thread, in order, so a slow worker does not hold
+        up the event loop.
+
+        This method is a coroutine_.
+
+        .. _coroutine: https://docs.python.org/3/library/asyncio-task.html#coroutine
+        """
+        yield from self.loop.run_in_executor(self.executor, self.put_nowait, msg)
+
+    def close(self, timeout=None):
+        """
+        Stop the workers once they have handled the messages sent to
+        them, and merge their final declarations.
+
+        """
+        self.closing = True
+        self.executor.shutdown(wait=True)
+        for worker in self.workers:
+            worker.inputs.close()
+        for n, worker in enumerate(self.workers):
+            self.loop.remove_reader(worker.outputs.fileno())
+            try:
+                while worker.outputs.poll(timeout):
+                    seq, self.views[n] = worker.outputs.recv()
+            except (EOFError, OSError):
+                pass
+            worker.outputs.close()
+            worker.process.join(timeout)
+        self.merge()
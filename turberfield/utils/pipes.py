@@ -138,6 +138,22 @@ class PipeQueue(SimplePipeQueue):
         msg = yield from pq.get()
         pq.close()
 
+    :param maxsize: If greater than zero, bounds the number of messages
+                    held in memory.
+    :param high: The number of messages held at which the queue stops
+                 reading from its pipe. Defaults to `maxsize`.
+    :param low: The number of messages held at which the queue resumes
+                reading. Defaults to half of `high`.
+    :param policy: Either "block", to stop reading at the high
+                   watermark, so that writers to the pipe are eventually
+                   held up, or "drop", to discard messages which arrive
+                   when the queue is full.
+
+    Under the "block" policy, a writer in the same process as the reader
+    should use `put`, which waits while reading is paused. Nothing drains
+    the pipe in that time, so enough calls to `put_nowait` fill its buffer
+    and block the thread which runs the event loop.
+
     .. _asyncio.Queue: https://docs.python.org/3/library/asyncio-queue.html#queue
     """
 
@@ -146,18 +162,83 @@ class PipeQueue(SimplePipeQueue):
         payload = fObj.readline().rstrip("\n")
         q.put_nowait(ast.literal_eval(payload))
 
-    def __init__(self, *args, **kwargs):
+    def __init__(self, *args, maxsize=0, high=None, low=None, policy="block", **kwargs):
         super().__init__(*args, **kwargs)
-        self._q = asyncio.Queue()
+        if policy not in ("block", "drop"):
+            raise ValueError("Unknown policy {0!r}".format(policy))
+        self.maxsize = maxsize
+        self.policy = policy
+        self.high = (high or maxsize) if policy == "block" else None
+        self.low = self.high // 2 if self.high and low is None else low
+        self.dropped = 0
+        self.paused = False
+        self._pending = bytearray()
+        self._q = asyncio.Queue(maxsize if policy == "drop" else 0)
+        self._ready = asyncio.Event()
+        self._ready.set()
 
     def __enter__(self):
         super().__enter__()
 
         fd = self._out.fileno()
         loop = asyncio.get_event_loop()
-        loop.add_reader(fd, PipeQueue.get_when_ready, self._out, self._q)
+        loop.add_reader(fd, self.receive)
         return self
 
+    @property
+    def metrics(self):
+        """
+        A dictionary of the queue's depth, bound, the number of messages
+        dropped and whether reading is paused.
+        """
+        return {
+            "qsize": self._q.qsize(), "maxsize": self.maxsize,
+            "dropped": self.dropped, "paused": self.paused
+        }
+
+    def receive(self):
+        # Lines are split here, so none is left unseen in a file buffer
+        # when the pipe is no longer readable.
+        try:
+            self._pending += os.read(self._out.fileno(), 65536)
+        except BlockingIOError:
+            pass
+        self.deliver()
+
+    def deliver(self):
+        while not self.paused:
+            end = self._pending.find(b"\n")
+            if end == -1:
+                return
+            payload = self._pending[:end].decode("utf-8")
+            del self._pending[:end + 1]
+            try:
+                self._q.put_nowait(ast.literal_eval(payload))
+            except asyncio.QueueFull:
+                self.dropped += 1
+            if self.high and self._q.qsize() >= self.high:
+                self.paused = True
+                self._ready.clear()
+                asyncio.get_event_loop().remove_reader(self._out.fileno())
+
+    def release(self):
+        if self.paused and self._q.qsize() <= self.low:
+            self.paused = False
+            self._ready.set()
+            asyncio.get_event_loop().add_reader(self._out.fileno(), self.receive)
+            self.deliver()
+
+    @asyncio.coroutine
+    def capacity(self):
+        """
+        Wait until the queue is reading from its pipe.
+
+        This method is a coroutine_.
+
+        .. _coroutine: https://docs.python.org/3/library/asyncio-task.html#coroutine
+        """
+        yield from self._ready.wait()
+
     @asyncio.coroutine
     def get(self):
         """
@@ -169,25 +250,34 @@ class PipeQueue(SimplePipeQueue):
         .. _coroutine: https://docs.python.org/3/library/asyncio-task.html#coroutine
         """
         rv = yield from self._q.get()
+        self.release()
+        return rv
+
+    def get_nowait(self):
+        """
+        Remove and return an item from the queue if one is immediately
+        available, else raise `asyncio.QueueEmpty`.
+        """
+        rv = self._q.get_nowait()
+        self.release()
         return rv
 
     @asyncio.coroutine
     def put(self, msg):
         """
-        Put an item into the queue. If the queue is full, wait until
-        a free slot is available before adding item.
+        Put an item into the queue. If reading from the pipe is paused,
+        wait until it resumes before adding item.
 
         This method is a coroutine_.
 
         .. _coroutine: https://docs.python.org/3/library/asyncio-task.html#coroutine
         """
-        future = asyncio.Future()
+        yield from self.capacity()
         self.put_nowait(msg)
-        future.set_result(msg)
-        return future
 
     def close(self):
         loop = asyncio.get_event_loop()
-        loop.remove_reader(self._out.fileno())
+        if not self.paused:
+            loop.remove_reader(self._out.fileno())
         self._out.close()
         self._in.close()
@@ -17,17 +17,31 @@
 # along with turberfield.  If not, see <http://www.gnu.org/licenses/>.
 
 
+import array
+import asyncio
+import base64
+import concurrent.futures
 import decimal
+import io
+import json
 import enum
+import os
+import hashlib
 from collections import Counter
 from collections import deque
 from collections import namedtuple
 from decimal import Decimal
+import subprocess
+import sys
 import textwrap
+import types
+import typing
 import uuid
 import unittest
 
 from turberfield.utils.assembly import Assembly
+from turberfield.utils.encoder import FragmentCache
+from turberfield.utils.encoder import Indentation
 
 
 class Wheelbarrow:
@@ -56,6 +70,31 @@ class Wheelbarrow:
         self.handles = deque(handles, maxlen=2)
         self.contents = Counter(dict(contents))
 
+
+class Registered:
+    """
+    A mixin for test cases which register `types` with Assembly. The
+    registries of Assembly are saved before each test and restored after
+    it, so that no registration outlives its test.
+
+    """
+
+    registries = (
+        "acyclic", "decoding", "deferred", "encoding", "factories", "numerics", "pending",
+        "plans"
+    )
+    types = ()
+
+    def setUp(self):
+        self.saved = {i: getattr(Assembly, i).copy() for i in Registered.registries}
+        Assembly.register(*self.types)
+
+    def tearDown(self):
+        for i in Registered.registries:
+            getattr(Assembly, i).clear()
+            getattr(Assembly, i).update(self.saved[i])
+
+
 class AssemblyTester(unittest.TestCase):
 
     data = textwrap.dedent("""
@@ -219,3 +258,845 @@ class AssemblyTester(unittest.TestCase):
         self.assertEqual(obj.bucket, rv.bucket)
         self.assertEqual(obj.wheel, rv.wheel)
         self.assertEqual(obj.handles, rv.handles)
+
+
+class Sprocket:
+
+    __slots__ = ("teeth", "pitch")
+
+    def __init__(self, teeth=None, pitch=None):
+        self.teeth = teeth
+        self.pitch = pitch
+
+
+class PlanTests(Registered, unittest.TestCase):
+
+    Spoke = namedtuple("Spoke", ["length", "gauge"])
+    types = (Sprocket, Spoke, Wheelbarrow)
+
+    def test_plans_are_compiled(self):
+        self.assertIn(Sprocket, Assembly.plans)
+        self.assertIn(PlanTests.Spoke, Assembly.plans)
+        self.assertIn(Wheelbarrow, Assembly.plans)
+
+    def test_namedtuple_plan(self):
+        rv = Assembly.plans[PlanTests.Spoke](PlanTests.Spoke(290, 14))
+        self.assertEqual(
+            ["_type", "length", "gauge"], list(rv.keys())
+        )
+        self.assertEqual(290, rv["length"])
+
+    def test_slots_plan(self):
+        obj = Sprocket(teeth=32, pitch=Decimal("12.7"))
+        rv = Assembly.loads(Assembly.dumps(obj))
+        self.assertIsInstance(rv, Sprocket)
+        self.assertEqual(32, rv.teeth)
+        self.assertEqual(Decimal("12.7"), rv.pitch)
+
+    def test_class_plan(self):
+        obj = Wheelbarrow(bucket=Wheelbarrow.Bucket(45))
+        rv = Assembly.plans[Wheelbarrow](obj)
+        self.assertEqual(
+            ["_type", "bucket", "wheel", "handles", "contents"], list(rv.keys())
+        )
+
+    def test_plan_from_encoding(self):
+        del Assembly.plans[PlanTests.Spoke]
+        text = Assembly.dumps(PlanTests.Spoke(290, 14))
+        self.assertIn(PlanTests.Spoke, Assembly.plans)
+        self.assertEqual(PlanTests.Spoke(290, 14), Assembly.loads(text))
+
+
+class FastEncodingTests(Registered, unittest.TestCase):
+
+    def setUp(self):
+        super().setUp()
+        Assembly.register(
+            Wheelbarrow,
+            Wheelbarrow.Brick,
+            Wheelbarrow.Bucket,
+            Wheelbarrow.Colour,
+            Wheelbarrow.Grip,
+            Wheelbarrow.Handle,
+            Wheelbarrow.Rim,
+            Wheelbarrow.Tyre,
+            Wheelbarrow.Wheel,
+            namespace="turberfield"
+        )
+
+    def test_fast_matches_python(self):
+        obj = Assembly.loads(AssemblyTester.data)
+        for kwargs in (
+            {}, {"sort_keys": True}, {"separators": (",", ":")},
+            {"check_circular": False}, {"ensure_ascii": False},
+        ):
+            with self.subTest(kwargs=kwargs):
+                self.assertEqual(
+                    Assembly.dumps(obj, **kwargs),
+                    Assembly.dumps(obj, fast=True, **kwargs)
+                )
+
+    def test_fast_namedtuple_in_containers(self):
+        brick = Wheelbarrow.Brick("red")
+        obj = {"bricks": [brick, (brick, "loose")], "count": Counter(a=1)}
+        text = Assembly.dumps(obj, fast=True)
+        self.assertEqual(Assembly.dumps(obj), text)
+        self.assertEqual(brick, Assembly.loads(text)["bricks"][0])
+
+    def test_fast_skipkeys(self):
+        obj = {"a": 1, (1, 2): Wheelbarrow.Brick("red")}
+        self.assertEqual(
+            Assembly.dumps(obj, skipkeys=True),
+            Assembly.dumps(obj, skipkeys=True, fast=True)
+        )
+        self.assertRaises(TypeError, Assembly.dumps, obj, fast=True)
+
+    def test_fast_circular(self):
+        obj = {"bricks": []}
+        obj["bricks"].append(obj)
+        self.assertRaises(ValueError, Assembly.dumps, obj, fast=True)
+
+    def test_fast_ignored_with_indent(self):
+        obj = Assembly.loads(AssemblyTester.data)
+        self.assertEqual(
+            Assembly.dumps(obj, indent=4),
+            Assembly.dumps(obj, indent=4, fast=True)
+        )
+
+
+class IterloadTests(Registered, unittest.TestCase):
+
+    def setUp(self):
+        super().setUp()
+        Assembly.register(
+            Wheelbarrow.Brick, Wheelbarrow.Grip, Wheelbarrow.Colour,
+            namespace="turberfield"
+        )
+        self.items = [
+            Wheelbarrow.Brick("red"),
+            Wheelbarrow.Grip(15, Wheelbarrow.Colour.green),
+            Wheelbarrow.Brick("ȳellow"),
+        ]
+
+    def rson(self):
+        rv = io.StringIO()
+        for i in self.items:
+            Assembly.dump(i, rv, indent=0)
+            rv.write("\n")
+        rv.seek(0)
+        return rv
+
+    def test_text_stream(self):
+        for bufsize in (1, 7, 65536):
+            with self.subTest(bufsize=bufsize):
+                rv = list(Assembly.iterload(self.rson(), bufsize=bufsize))
+                self.assertEqual(self.items, rv)
+
+    def test_binary_stream(self):
+        data = self.rson().getvalue().encode("utf-8")
+        for bufsize in (1, 7, 65536):
+            with self.subTest(bufsize=bufsize):
+                rv = list(Assembly.iterload(io.BytesIO(data), bufsize=bufsize))
+                self.assertEqual(self.items, rv)
+
+    def test_numbers_at_buffer_boundary(self):
+        rv = list(Assembly.iterload(io.StringIO("12 345\n6.75 "), bufsize=2))
+        self.assertEqual([12, 345, Decimal("6.75")], rv)
+
+    def test_first_object_before_end(self):
+        fObj = self.rson()
+        gen = Assembly.iterload(fObj, bufsize=16)
+        self.assertEqual(self.items[0], next(gen))
+        self.assertLess(fObj.tell(), len(fObj.getvalue()))
+
+    def test_truncated_stream(self):
+        text = self.rson().getvalue()[:-8]
+        gen = Assembly.iterload(io.StringIO(text), bufsize=16)
+        self.assertRaises(ValueError, list, gen)
+
+    def test_malformed_fails_early(self):
+        text = self.rson().getvalue()
+        fObj = io.StringIO(text + "{\n\"colour\" \"red\"\n}\n" + text * 100)
+        gen = Assembly.iterload(fObj, bufsize=16)
+        self.assertEqual(self.items, [next(gen) for i in self.items])
+        with self.assertRaises(json.JSONDecodeError) as context:
+            next(gen)
+        self.assertEqual(len(text) + 11, context.exception.pos)
+        self.assertLess(fObj.tell(), len(text) * 2)
+
+
+class BinaryDumpTests(Registered, unittest.TestCase):
+
+    def setUp(self):
+        super().setUp()
+        Assembly.register(
+            Wheelbarrow,
+            Wheelbarrow.Brick,
+            Wheelbarrow.Bucket,
+            Wheelbarrow.Colour,
+            Wheelbarrow.Grip,
+            Wheelbarrow.Handle,
+            Wheelbarrow.Rim,
+            Wheelbarrow.Tyre,
+            Wheelbarrow.Wheel,
+            namespace="turberfield"
+        )
+        self.obj = Assembly.loads(AssemblyTester.data)
+
+    def test_blocks(self):
+        chunks = ["ab", "c", "dé", "f"]
+        self.assertEqual(
+            ["abc", "déf"], list(Assembly.blocks(chunks, 3, encoding=None))
+        )
+        self.assertEqual(
+            [b"abc", "déf".encode("utf-8")], list(Assembly.blocks(chunks, 3))
+        )
+
+    def test_dump_binary(self):
+        expected = Assembly.dumps(self.obj, indent=4, ensure_ascii=False)
+        for blocksize in (1, 64, 65536):
+            with self.subTest(blocksize=blocksize):
+                fObj = io.BytesIO()
+                Assembly.dump(
+                    self.obj, fObj, indent=4, ensure_ascii=False, blocksize=blocksize
+                )
+                self.assertEqual(expected.encode("utf-8"), fObj.getvalue())
+
+    def test_dump_text_blocks(self):
+        fObj = io.StringIO()
+        Assembly.dump(self.obj, fObj, indent=4, blocksize=256)
+        self.assertEqual(Assembly.dumps(self.obj, indent=4), fObj.getvalue())
+
+    def test_dumpb(self):
+        rv = Assembly.dumpb(self.obj)
+        self.assertIsInstance(rv, bytes)
+        self.assertEqual(Assembly.dumps(self.obj).encode("utf-8"), rv)
+
+
+class ObjectHookTests(Registered, unittest.TestCase):
+
+    def setUp(self):
+        super().setUp()
+        Assembly.register(
+            Wheelbarrow.Brick, Wheelbarrow.Colour,
+            namespace="turberfield"
+        )
+
+    def test_factories_resolved_on_registration(self):
+        tag = Assembly.encoding[Wheelbarrow.Colour]
+        self.assertEqual(Wheelbarrow.Colour.factory, Assembly.factories[tag])
+        tag = Assembly.encoding[Wheelbarrow.Brick]
+        self.assertIs(Wheelbarrow.Brick, Assembly.factories[tag])
+
+    def test_untagged_dict(self):
+        obj = {"colour": "red"}
+        self.assertIs(obj, Assembly.object_hook(obj))
+        self.assertEqual({"colour": "red"}, obj)
+
+    def test_unknown_tag(self):
+        rv = Assembly.object_hook({"_type": "unknown", "colour": "red"})
+        self.assertEqual({"colour": "red"}, rv)
+
+    def test_bad_arguments(self):
+        tag = Assembly.encoding[Wheelbarrow.Brick]
+        rv = Assembly.object_hook({"_type": tag, "weight": 3})
+        self.assertEqual({"weight": 3}, rv)
+
+    def test_loads_many(self):
+        objs = [
+            Wheelbarrow.Brick("red"), Wheelbarrow.Colour.blue, {"a": 1.5}, []
+        ]
+        rv = Assembly.loads_many(Assembly.dumps(i) for i in objs)
+        self.assertEqual(objs, rv)
+        self.assertIsInstance(rv[2]["a"], Decimal)
+
+
+class Reading(typing.NamedTuple):
+
+    sensor: str
+    value: float
+    calibration: Decimal
+
+
+class NumericTests(Registered, unittest.TestCase):
+
+    types = (Reading,)
+
+    def setUp(self):
+        super().setUp()
+        self.text = Assembly.dumps(
+            {"reading": Reading("t1", 21.5, Decimal("0.125")), "scale": 1.5}
+        )
+
+    def test_numerics_from_annotations(self):
+        tag = Assembly.encoding[Reading]
+        self.assertEqual(
+            {"value": float, "calibration": Decimal}, Assembly.numerics[tag]
+        )
+
+    def test_decimal_by_default(self):
+        rv = Assembly.loads(self.text)
+        self.assertIsInstance(rv["scale"], Decimal)
+        self.assertIsInstance(rv["reading"].value, Decimal)
+
+    def test_float_policy(self):
+        rv = Assembly.loads(self.text, parse_float=float)
+        self.assertIsInstance(rv["scale"], float)
+        self.assertIsInstance(rv["reading"].calibration, float)
+
+    def test_annotations_with_float(self):
+        rv = Assembly.loads(self.text, parse_float=float, annotations=True)
+        self.assertIsInstance(rv["scale"], float)
+        self.assertIsInstance(rv["reading"].value, float)
+        self.assertEqual(Decimal("0.125"), rv["reading"].calibration)
+
+    def test_annotations_with_decimal(self):
+        rv = Assembly.loads(self.text, annotations=True)
+        self.assertIsInstance(rv["scale"], Decimal)
+        self.assertEqual(21.5, rv["reading"].value)
+        self.assertIsInstance(rv["reading"].value, float)
+        self.assertIsInstance(rv["reading"].calibration, Decimal)
+
+    def test_annotations_exact(self):
+        text = (
+            '[{"_type": "' + Assembly.encoding[Reading] + '", "sensor": "t1", "value": 0.1, '
+            '"calibration": 0.1000000000000000055511151231257827}, [2.5], 3.5]'
+        )
+        rv = Assembly.loads(text, parse_float=float, annotations=True)
+        self.assertEqual(Decimal("0.1000000000000000055511151231257827"), rv[0].calibration)
+        self.assertEqual(0.1, rv[0].value)
+        self.assertEqual([[2.5], 3.5], rv[1:])
+        self.assertIs(float, type(rv[1][0]))
+        self.assertIs(float, type(rv[2]))
+
+    def test_streaming_policy(self):
+        rv = next(Assembly.iterload(io.StringIO(self.text), parse_float=float))
+        self.assertIsInstance(rv["scale"], float)
+        rv = Assembly.loads_many([self.text], parse_float=float, annotations=True)
+        self.assertIsInstance(rv[0]["reading"].calibration, Decimal)
+
+
+class ParallelTests(Registered, unittest.TestCase):
+
+    types = (Reading,)
+
+    def setUp(self):
+        super().setUp()
+        self.items = [
+            Reading("t{0}".format(n), n / 4, Decimal(n)) if n % 3 else {"n": [n, []]}
+            for n in range(50)
+        ]
+
+    def test_identical_output(self):
+        with concurrent.futures.ProcessPoolExecutor(max_workers=2) as executor:
+            for kwargs in (
+                {}, {"indent": 0}, {"indent": 4}, {"separators": (",", ":")},
+                {"sort_keys": True, "fast": True},
+            ):
+                with self.subTest(kwargs=kwargs):
+                    self.assertEqual(
+                        Assembly.dumps(self.items, **kwargs),
+                        Assembly.dumps_parallel(
+                            self.items, executor=executor, chunksize=7, **kwargs
+                        )
+                    )
+
+    def test_columnar(self):
+        items = [Reading("t{0}".format(n), n / 4, Decimal(n)) for n in range(50)]
+        for kwargs in ({"columnar": True}, {"columnar": True, "indent": 4}):
+            with self.subTest(kwargs=kwargs):
+                self.assertEqual(
+                    Assembly.dumps(items, **kwargs),
+                    Assembly.dumps_parallel(items, workers=2, chunksize=7, **kwargs)
+                )
+
+    def test_empty_sequence(self):
+        self.assertEqual("[]", Assembly.dumps_parallel([], indent=4))
+
+    def test_dump_parallel(self):
+        fObj = io.StringIO()
+        Assembly.dump_parallel(self.items, fObj, workers=2, chunksize=16)
+        self.assertEqual(Assembly.dumps(self.items), fObj.getvalue())
+
+
+class SnapshotTests(Registered, unittest.TestCase):
+
+    def setUp(self):
+        super().setUp()
+        for i in Registered.registries:
+            getattr(Assembly, i).clear()
+        Assembly.register(Reading, Wheelbarrow.Colour, Wheelbarrow)
+        self.table = Assembly.snapshot()
+        self.text = Assembly.dumps(
+            [Reading("t1", 21.5, Decimal("0.125")), Wheelbarrow.Colour.red]
+        )
+        for i in Registered.registries:
+            getattr(Assembly, i).clear()
+
+    def test_snapshot_is_json(self):
+        table = json.loads(json.dumps(self.table))
+        self.assertEqual(
+            [Reading.__module__, "Wheelbarrow.Colour"],
+            table[Reading.__module__ + ".Colour"]
+        )
+
+    def test_restore_is_lazy(self):
+        Assembly.restore(self.table)
+        self.assertFalse(Assembly.decoding)
+        self.assertEqual(3, len(Assembly.pending))
+
+    def test_resolve_on_decode(self):
+        Assembly.restore(self.table)
+        rv = Assembly.loads(self.text, parse_float=float, annotations=True)
+        self.assertEqual(Reading("t1", 21.5, Decimal("0.125")), rv[0])
+        self.assertIs(Wheelbarrow.Colour.red, rv[1])
+        self.assertEqual(1, len(Assembly.pending))
+        self.assertIn(Reading, Assembly.encoding)
+
+    def test_resolve_on_encode(self):
+        Assembly.restore(self.table)
+        tag = Reading.__module__ + ".Wheelbarrow"
+        rv = Assembly.dumps(Wheelbarrow())
+        self.assertIn(tag, rv)
+        self.assertNotIn(tag, Assembly.pending)
+        self.assertIn(Wheelbarrow, Assembly.plans)
+
+    def test_unresolvable(self):
+        Assembly.restore({"nowhere.Thing": ["nowhere", "Thing"]})
+        self.assertEqual({}, Assembly.loads('{"_type": "nowhere.Thing"}'))
+        self.assertFalse(Assembly.pending)
+
+
+class ColumnarTests(Registered, unittest.TestCase):
+
+    types = (Reading, Wheelbarrow.Colour)
+
+    def setUp(self):
+        super().setUp()
+        self.items = [
+            Reading("t{0}".format(n), n / 4, Decimal(n)) for n in range(100)
+        ]
+
+    def test_columnar_is_smaller(self):
+        text = Assembly.dumps({"items": self.items}, columnar=True)
+        self.assertLess(len(text), len(Assembly.dumps({"items": self.items})) / 2)
+        self.assertEqual(1, text.count(Assembly.encoding[Reading]))
+        self.assertEqual(1, text.count('"calibration"'))
+
+    def test_roundtrip(self):
+        for kwargs in ({}, {"indent": 4}, {"fast": True}):
+            with self.subTest(kwargs=kwargs):
+                text = Assembly.dumps({"items": self.items}, columnar=True, **kwargs)
+                rv = Assembly.loads(text, parse_float=float, annotations=True)
+                self.assertIsInstance(rv["items"], Assembly.Batch)
+                self.assertEqual(100, len(rv["items"]))
+                self.assertEqual(self.items[5], rv["items"][5])
+                self.assertEqual(self.items[-3:], rv["items"][-3:])
+                self.assertEqual(self.items, list(rv["items"]))
+
+    def test_numeric_types(self):
+        for parse_float in (float, Decimal):
+            with self.subTest(parse_float=parse_float):
+                expected = Assembly.loads(
+                    Assembly.dumps(self.items), parse_float=parse_float, annotations=True
+                )
+                rv = Assembly.loads(
+                    Assembly.dumps(self.items, columnar=True),
+                    parse_float=parse_float, annotations=True
+                )
+                self.assertEqual(expected, list(rv))
+                self.assertEqual(
+                    [type(i) for i in expected[5]], [type(i) for i in rv[5]]
+                )
+
+    def test_batch_reencodes_as_columns(self):
+        text = Assembly.dumps(self.items, columnar=True)
+        rv = Assembly.loads(text)
+        self.assertEqual(text, Assembly.dumps(rv))
+
+    def test_mixed_lists_unchanged(self):
+        obj = [self.items[0], Wheelbarrow.Colour.red, self.items[1]]
+        self.assertEqual(Assembly.dumps(obj), Assembly.dumps(obj, columnar=True))
+        obj = [Wheelbarrow.Colour.red, Wheelbarrow.Colour.blue]
+        self.assertEqual(Assembly.dumps(obj), Assembly.dumps(obj, columnar=True))
+        obj = self.items[:1]
+        self.assertEqual(Assembly.dumps(obj), Assembly.dumps(obj, columnar=True))
+
+
+class CacheTests(Registered, unittest.TestCase):
+
+    types = (Reading, Sprocket, Wheelbarrow.Colour, Wheelbarrow.Bucket)
+
+    def setUp(self):
+        super().setUp()
+        self.refs = [Reading("r{0}".format(n), n / 4, Decimal(n)) for n in range(10)]
+        self.data = [
+            {
+                "ref": self.refs[n % 10],
+                "colour": Wheelbarrow.Colour.red,
+                "bucket": Wheelbarrow.Bucket([n]),
+            }
+            for n in range(100)
+        ]
+
+    def test_identical_output(self):
+        for kwargs in ({}, {"indent": 4}, {"sort_keys": True}):
+            with self.subTest(kwargs=kwargs):
+                self.assertEqual(
+                    Assembly.dumps(self.data, **kwargs),
+                    Assembly.dumps(self.data, cache=True, **kwargs)
+                )
+
+    def test_hit_rate(self):
+        cache = FragmentCache()
+        Assembly.dumps(self.data, cache=cache)
+        # Buckets hold a list, so are never looked up. Each Reading holds a Decimal.
+        self.assertEqual(10 + 10 + 1, cache.misses)
+        self.assertEqual(90 + 99, cache.hits)
+        self.assertAlmostEqual(189 / 210, cache.hit_rate)
+
+        Assembly.dumps(self.data, cache=cache)
+        self.assertEqual(189 + 200, cache.hits)
+        self.assertEqual(21, cache.misses)
+
+    def test_depth_in_compact_output(self):
+        ref = self.refs[0]
+        obj = [ref, [ref, [ref]], {"a": {"b": ref}}]
+        cache = FragmentCache()
+        self.assertEqual(Assembly.dumps(obj), Assembly.dumps(obj, cache=cache))
+        # One fragment each for the Reading and its Decimal.
+        self.assertEqual(2, len(cache.fragments))
+        self.assertEqual(3, cache.hits)
+
+        # Indented, the Reading appears at three levels.
+        cache = FragmentCache()
+        self.assertEqual(Assembly.dumps(obj, indent=4), Assembly.dumps(obj, indent=4, cache=cache))
+        self.assertEqual(6, len(cache.fragments))
+        self.assertEqual(1, cache.hits)
+
+    def test_mutable_contents_not_cached(self):
+        cache = FragmentCache()
+        obj = Wheelbarrow.Bucket(Sprocket(teeth=32))
+        Assembly.dumps(obj, cache=cache)
+        obj.capacity.teeth = 36
+        self.assertIn('"teeth": 36', Assembly.dumps(obj, cache=cache))
+        self.assertFalse(cache.fragments)
+
+    def test_immutable_types(self):
+        cache = FragmentCache(immutable={Sprocket})
+        obj = Wheelbarrow.Bucket(Sprocket(teeth=32))
+        Assembly.dumps([obj, obj], cache=cache)
+        self.assertEqual(1, cache.hits)
+
+    def test_unhashable_not_cached(self):
+        cache = FragmentCache()
+        Assembly.dumps(self.data, cache=cache)
+        self.assertEqual(21, len(cache.fragments))
+        self.assertFalse(
+            any(isinstance(o, Wheelbarrow.Bucket) for o, _ in cache.fragments.values())
+        )
+
+    def test_bounded(self):
+        cache = FragmentCache(maxsize=4)
+        Assembly.dumps(self.data, cache=cache)
+        self.assertEqual(4, len(cache.fragments))
+
+    def test_settings_change(self):
+        cache = FragmentCache()
+        Assembly.dumps(self.data, cache=cache)
+        self.assertEqual(
+            Assembly.dumps(self.data, indent=2),
+            Assembly.dumps(self.data, indent=2, cache=cache)
+        )
+
+
+class CircularTests(Registered, unittest.TestCase):
+
+    types = (Reading, Wheelbarrow.Colour)
+
+    def setUp(self):
+        super().setUp()
+        Assembly.register(Sprocket, acyclic=True)
+        self.data = {
+            "readings": [Reading("r{0}".format(n), n / 4, Decimal(n)) for n in range(10)],
+            "sprockets": [Sprocket(n, [Wheelbarrow.Colour.red]) for n in range(10)],
+            "nested": [[[[{"depth": [5]}]]]],
+        }
+
+    def test_acyclic_registration(self):
+        self.assertIn(Sprocket, Assembly.acyclic)
+        self.assertIn(Wheelbarrow.Colour, Assembly.acyclic)
+        self.assertNotIn(Reading, Assembly.acyclic)
+
+    def test_identical_output(self):
+        expected = Assembly.dumps(self.data, acyclic=frozenset())
+        for kwargs in ({}, {"circular_depth": 3}, {"circular_depth": 100}, {"cache": True}):
+            with self.subTest(kwargs=kwargs):
+                self.assertEqual(expected, Assembly.dumps(self.data, **kwargs))
+                self.assertEqual(
+                    Assembly.dumps(self.data, indent=4, acyclic=frozenset()),
+                    Assembly.dumps(self.data, indent=4, **kwargs)
+                )
+
+    def test_cycle_detected(self):
+        cycle = []
+        cycle.append({"items": cycle})
+        for depth in (0, 3, 100):
+            with self.subTest(depth=depth):
+                self.assertRaises(
+                    ValueError, Assembly.dumps, {"cycle": cycle}, circular_depth=depth
+                )
+
+    def test_default_cycle_detected(self):
+        obj = Sprocket(0, None)
+        obj.teeth = obj
+        Assembly.acyclic.discard(Sprocket)
+        self.assertRaises(ValueError, Assembly.dumps, [obj], circular_depth=100)
+
+
+class FusedTests(unittest.TestCase):
+
+    def setUp(self):
+        self.data = {
+            "ints": list(range(-50, 50)),
+            "floats": [n / 7 for n in range(100)],
+            "strs": ["s{0}".format(n) for n in range(20)] + ["café", "\"q\""],
+            "coords": [(n, n + 0.5, n + 1.0) for n in range(10)],
+            "bools": [True, False, True],
+            "mixed": [1, 1.5, "a", None, True],
+            "enums": [enum.IntEnum("Level", "low high").high, 3],
+            "nested": [[1, 2], [3.0, 4.0], {"x": 1, "y": 2}, {"z": "a", "y": "b"}],
+            "keys": {1: 2, 3: 4},
+        }
+
+    def test_identical_output(self):
+        for kwargs in (
+            {}, {"indent": 4}, {"indent": 0}, {"sort_keys": True}, {"ensure_ascii": False},
+            {"separators": (",", ":")},
+        ):
+            with self.subTest(kwargs=kwargs):
+                self.assertEqual(
+                    json.dumps(self.data, **kwargs), Assembly.dumps(self.data, **kwargs)
+                )
+
+
+
+class IndentationTests(unittest.TestCase):
+
+    def test_levels_built_once(self):
+        indents = Indentation("  ", ",")
+        self.assertEqual(("\n    ", ",\n    "), indents[2])
+        self.assertIs(indents[2], indents[2])
+        self.assertEqual([2], list(indents))
+
+    def test_identical_output(self):
+        data = {
+            "items": [
+                {"id": n, "ok": n % 2 == 0, "tags": ["a", n, None, [n, {}], []],
+                 "sub": {"x": n / 3, "y": [{"z": None}], 2: "two"}}
+                for n in range(10)
+            ]
+        }
+        for kwargs in ({"indent": 4}, {"indent": 0}, {"indent": "\t", "sort_keys": False}):
+            with self.subTest(kwargs=kwargs):
+                self.assertEqual(json.dumps(data, **kwargs), Assembly.dumps(data, **kwargs))
+
+
+class BufferTests(Registered, unittest.TestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.values = array.array("d", [n / 7 for n in range(100)])
+
+    def test_array_mode(self):
+        for obj in (self.values, memoryview(self.values), bytearray(b"ab")):
+            with self.subTest(obj=type(obj)):
+                self.assertEqual(json.dumps(list(obj)), Assembly.dumps(obj))
+
+    def test_typed_roundtrip(self):
+        for obj in (
+            self.values, memoryview(self.values), memoryview(self.values)[::3],
+            array.array("h", range(-5, 5)), array.array("B", b"bytes"),
+        ):
+            for kwargs in ({}, {"fast": True}, {"cache": True}):
+                with self.subTest(obj=obj, kwargs=kwargs):
+                    text = Assembly.dumps({"data": obj}, typed=True, **kwargs)
+                    rv = Assembly.loads(text)["data"]
+                    self.assertIsInstance(rv, array.array)
+                    self.assertEqual(list(obj), list(rv))
+
+    def test_typed_is_smaller(self):
+        self.assertLess(
+            len(Assembly.dumps(self.values, typed=True)), len(Assembly.dumps(self.values))
+        )
+
+    def test_byteorder(self):
+        other = "big" if sys.byteorder == "little" else "little"
+        swapped = array.array("i", [1, 256])
+        swapped.byteswap()
+        text = json.dumps({
+            "_type": Assembly.buffer.tag, "typecode": "i", "byteorder": other,
+            "data": base64.b64encode(swapped).decode("ascii")
+        })
+        self.assertEqual(array.array("i", [1, 256]), Assembly.loads(text))
+
+    def test_buffer_types_remembered(self):
+        Assembly.dumps([Decimal("1.5"), bytearray(b"ab")])
+        self.assertIs(False, Assembly.Encoder.buffers[Decimal])
+        self.assertIs(True, Assembly.Encoder.buffers[bytearray])
+
+    def test_tag_unlike_registered(self):
+        text = Assembly.dumps(self.values, typed=True)
+        Assembly.register(array.array)
+        self.assertNotIn(Assembly.buffer.tag, Assembly.decoding)
+        self.assertEqual(self.values, Assembly.loads(text))
+
+    def test_tags_as_registered(self):
+        for obj in (Assembly.buffer, Assembly.Batch):
+            with self.subTest(obj=obj):
+                self.assertEqual("turberfield.utils.assembly." + obj.__name__, obj.tag)
+
+    def test_multidimensional(self):
+        view = memoryview(bytes(range(6))).cast("B", (2, 3))
+        self.assertEqual([[0, 1, 2], [3, 4, 5]], Assembly.loads(Assembly.dumps(view, typed=True)))
+
+
+class ImportTests(unittest.TestCase):
+
+    def test_import_alone(self):
+        # Assembly must not depend on the generator-based coroutines of
+        # the asyncio modules, which newer Pythons lack.
+        rv = subprocess.run(
+            [sys.executable, "-c", "; ".join([
+                "import sys",
+                "from turberfield.utils.assembly import Assembly",
+                "from turberfield.utils.wire import dumpb",
+                "assert 'turberfield.utils.expert' not in sys.modules",
+                "assert 'turberfield.utils.pipes' not in sys.modules",
+            ])],
+            cwd=os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(
+                os.path.abspath(__file__)
+            )))),
+            stdout=subprocess.PIPE, stderr=subprocess.PIPE
+        )
+        self.assertEqual(0, rv.returncode, rv.stderr.decode("utf-8"))
+
+
+class AsyncDumpTests(unittest.TestCase):
+
+    class Writer:
+
+        def __init__(self):
+            self.blocks = []
+            self.drained = 0
+
+        def write(self, data):
+            self.blocks.append(data)
+
+        @types.coroutine
+        def drain(self):
+            # Like a StreamWriter whose transport is not paused.
+            self.drained += 1
+            yield from ()
+
+    class Transport:
+
+        def __init__(self):
+            self.blocks = []
+
+        def write(self, data):
+            self.blocks.append(data)
+
+    def setUp(self):
+        self.loop = asyncio.new_event_loop()
+        self.data = {"items": [{"id": n, "name": "n{0}".format(n)} for n in range(2000)]}
+
+    def tearDown(self):
+        self.loop.close()
+
+    def ticks(self, writer, **kwargs):
+        rv = []
+
+        @types.coroutine
+        def ticker():
+            while True:
+                rv.append(len(writer.blocks))
+                yield from asyncio.sleep(0)
+
+        @types.coroutine
+        def main():
+            task = asyncio.ensure_future(ticker(), loop=self.loop)
+            yield from Assembly.dump_async(self.data, writer, loop=self.loop, **kwargs)
+            task.cancel()
+
+        self.loop.run_until_complete(main())
+        return rv
+
+    def test_stream_writer(self):
+        writer = AsyncDumpTests.Writer()
+        self.loop.run_until_complete(
+            Assembly.dump_async(self.data, writer, blocksize=1024, indent=4, loop=self.loop)
+        )
+        self.assertGreater(len(writer.blocks), 10)
+        self.assertEqual(len(writer.blocks), writer.drained)
+        self.assertEqual(Assembly.dumps(self.data, indent=4), b"".join(writer.blocks).decode())
+
+    def test_stream_writer_yields(self):
+        writer = AsyncDumpTests.Writer()
+        ticks = self.ticks(writer, blocksize=1024)
+        self.assertGreater(len(set(ticks)), 10)
+        self.assertEqual(Assembly.dumps(self.data), b"".join(writer.blocks).decode())
+
+    def test_transport_yields(self):
+        transport = AsyncDumpTests.Transport()
+        ticks = self.ticks(transport, blocksize=1024)
+        self.assertGreater(len(set(ticks)), 10)
+        self.assertEqual(Assembly.dumps(self.data), b"".join(transport.blocks).decode())
+
+    def test_executor_text(self):
+        transport = AsyncDumpTests.Transport()
+        with concurrent.futures.ThreadPoolExecutor(max_workers=1) as executor:
+            self.loop.run_until_complete(Assembly.dump_async(
+                self.data, transport, blocksize=1024, encoding=None, executor=executor,
+                loop=self.loop
+            ))
+        self.assertEqual(Assembly.dumps(self.data), "".join(transport.blocks))
+
+
+class DigestTests(Registered, unittest.TestCase):
+
+    types = (Reading,)
+
+    def setUp(self):
+        super().setUp()
+        self.data = {"b": [Reading("r1", 1.5, Decimal("0.25"))], "a": {"y": 2, "x": 1}}
+
+    def test_canonical(self):
+        text = Assembly.dumps(self.data, sort_keys=True, separators=(",", ":"))
+        self.assertEqual(
+            hashlib.blake2b(text.encode("utf-8"), digest_size=16).hexdigest(),
+            Assembly.digest(self.data)
+        )
+        reordered = {"a": {"x": 1, "y": 2}, "b": [Reading("r1", 1.5, Decimal("0.25"))]}
+        self.assertEqual(Assembly.digest(self.data), Assembly.digest(reordered))
+        self.assertNotEqual(Assembly.digest(self.data), Assembly.digest({}))
+
+    def test_other_hash(self):
+        self.assertEqual(64, len(Assembly.digest(self.data, digest=hashlib.sha256())))
+
+    def test_dump(self):
+        for kwargs in ({}, {"blocksize": 16}):
+            with self.subTest(kwargs=kwargs):
+                digest = hashlib.sha256()
+                fObj = io.StringIO()
+                Assembly.dump(self.data, fObj, indent=4, digest=digest, **kwargs)
+                self.assertEqual(
+                    hashlib.sha256(fObj.getvalue().encode("utf-8")).hexdigest(),
+                    digest.hexdigest()
+                )
+
+    def test_dump_binary(self):
+        digest = hashlib.sha256()
+        fObj = io.BytesIO()
+        Assembly.dump(self.data, fObj, blocksize=16, digest=digest)
+        self.assertEqual(hashlib.sha256(fObj.getvalue()).hexdigest(), digest.hexdigest())
@@ -17,14 +17,25 @@
 # along with turberfield.  If not, see <http://www.gnu.org/licenses/>.
 
 import asyncio
+from collections import namedtuple
 from collections import OrderedDict
+import functools
 from io import StringIO
 import json
+import multiprocessing
 import os
 import shutil
+import tempfile
+import threading
 import unittest
 
+from turberfield.utils.assembly import Assembly
 from turberfield.utils.expert import Expert
+from turberfield.utils.expert import Instruments
+from turberfield.utils.expert import PageReader
+from turberfield.utils.expert import Supervisor
+from turberfield.utils.expert import Writer
+from turberfield.utils.test.test_assembly import Registered
 
 
 class DeclarationTests(unittest.TestCase):
@@ -96,3 +107,665 @@ class TaskTests(unittest.TestCase):
         self.assertTrue(
             all(isinstance(i, asyncio.Task) for i in p._watchers)
         )
+
+
+class IncrementalTests(unittest.TestCase):
+
+    drcty = os.path.expanduser(os.path.join("~", ".turberfield"))
+
+    class Subclass(Expert):
+
+        incremental = True
+
+        @staticmethod
+        def options():
+            return OrderedDict([
+                ("log", Expert.RSON("log", "items", os.path.join(
+                    IncrementalTests.drcty, "log.rson"))),
+                ("page", Expert.HATEOAS("page", "items", os.path.join(
+                    IncrementalTests.drcty, "page.json"))),
+            ])
+
+    def setUp(self):
+        try:
+            os.mkdir(IncrementalTests.drcty)
+        except OSError:
+            pass
+        self.expert = IncrementalTests.Subclass(**IncrementalTests.Subclass.options())
+        self.rson, self.hateoas = (i.dst for i in self.expert._services.values())
+
+    def tearDown(self):
+        shutil.rmtree(IncrementalTests.drcty, ignore_errors=True)
+
+    def test_rson_appends(self):
+        self.expert.declare({"items": [{"n": 1}, {"n": 2}]})
+        inode = os.stat(self.rson).st_ino
+        self.expert.declare({"items": [{"n": 1}, {"n": 2}, {"n": 3}]})
+        self.assertEqual(inode, os.stat(self.rson).st_ino)
+        with open(self.rson, 'r') as check:
+            self.assertEqual(3, check.read().count('"n"'))
+
+    def test_rson_rewrites(self):
+        self.expert.declare({"items": [{"n": 1}, {"n": 2}]})
+        self.expert.declare({"items": [{"n": 2}]})
+        with open(self.rson, 'r') as check:
+            self.assertEqual(1, check.read().count('"n"'))
+
+    def test_rson_rewrites_altered_file(self):
+        self.expert.declare({"items": [{"n": 1}]})
+        with open(self.rson, 'a') as output:
+            output.write("{}\n")
+        self.expert.declare({"items": [{"n": 1}, {"n": 2}]})
+        with open(self.rson, 'r') as check:
+            self.assertNotIn("{}", check.read())
+
+    def test_hateoas_unchanged(self):
+        self.expert.declare({"items": [{"n": 1}]})
+        mtime = os.stat(self.hateoas).st_mtime_ns
+        with open(self.hateoas, 'r') as check:
+            ts = json.load(check)["info"]["ts"]
+        self.expert.declare({"items": [{"n": 1}]})
+        self.assertEqual(mtime, os.stat(self.hateoas).st_mtime_ns)
+        self.expert.declare({"items": [{"n": 2}]})
+        with open(self.hateoas, 'r') as check:
+            self.assertGreater(json.load(check)["info"]["ts"], ts)
+
+    def test_mixed_keys(self):
+        items = [{1: "a", "b": 2}]
+        self.expert.declare({"items": items})
+        mtime = os.stat(self.hateoas).st_mtime_ns
+        self.expert.declare({"items": [{1: "a", "b": 2}]})
+        self.assertEqual(mtime, os.stat(self.hateoas).st_mtime_ns)
+        with open(self.hateoas, 'r') as check:
+            self.assertEqual([{"1": "a", "b": 2}], json.load(check)["items"])
+        self.expert.declare({"items": items + [{2: "c"}]})
+        with open(self.rson, 'r') as check:
+            text = check.read()
+        self.assertEqual(1, text.count('"a"'))
+        self.assertEqual(1, text.count('"c"'))
+
+
+class WriterTests(unittest.TestCase):
+
+    def setUp(self):
+        self.writer = Writer()
+        self.done = []
+        self.gate = threading.Event()
+
+    def tearDown(self):
+        self.gate.set()
+        self.writer.close()
+
+    def test_order(self):
+        for n in range(10):
+            self.writer.submit(n, functools.partial(self.done.append, n))
+        self.assertTrue(self.writer.flush(timeout=5))
+        self.assertEqual(list(range(10)), self.done)
+        self.assertEqual(0, self.writer.outstanding)
+
+    def test_coalesce(self):
+        self.writer.submit("blocker", self.gate.wait)
+        for n in range(10):
+            self.writer.submit("dst", functools.partial(self.done.append, n))
+        self.assertEqual(2, self.writer.outstanding)
+        self.gate.set()
+        self.assertTrue(self.writer.flush(timeout=5))
+        self.assertEqual([9], self.done)
+
+    def test_failure_logged(self):
+        with self.assertLogs("turberfield.expert.writer", level="ERROR"):
+            self.writer.submit("dst", lambda: 1 / 0)
+            self.writer.flush(timeout=5)
+        self.writer.submit("dst", functools.partial(self.done.append, 0))
+        self.writer.flush(timeout=5)
+        self.assertEqual([0], self.done)
+
+    def test_declare(self):
+        fObj = StringIO()
+
+        class Subclass(Expert):
+
+            writer = self.writer
+
+            @staticmethod
+            def options():
+                return OrderedDict([("log", Expert.RSON("log", "items", fObj))])
+
+        expert = Subclass(**Subclass.options())
+        self.writer.submit("blocker", self.gate.wait)
+        expert.declare({"items": [{"n": 1}]})
+        self.assertIn('"n"', fObj.getvalue())
+        self.gate.set()
+
+    def test_declare_path(self):
+        with tempfile.TemporaryDirectory() as drcty:
+            dst = os.path.join(drcty, "log.rson")
+
+            class Subclass(Expert):
+
+                writer = self.writer
+
+                @staticmethod
+                def options():
+                    return OrderedDict([("log", Expert.RSON("log", "items", dst))])
+
+            expert = Subclass(**Subclass.options())
+            self.writer.submit("blocker", self.gate.wait)
+            for n in range(5):
+                expert.declare({"items": [{"n": n}]})
+            self.assertFalse(os.path.isfile(dst))
+            self.assertEqual(2, self.writer.outstanding)
+            self.gate.set()
+            self.writer.flush(timeout=5)
+            with open(dst, 'r') as check:
+                self.assertEqual({"n": 4}, json.loads(check.read()))
+
+
+class PageReaderTests(unittest.TestCase):
+
+    class Subclass(Expert):
+
+        indexed = True
+
+        @staticmethod
+        def options(drcty):
+            return OrderedDict([
+                ("log", Expert.RSON("log", "items", os.path.join(drcty, "log.rson"))),
+                ("page", Expert.HATEOAS("page", "items", os.path.join(drcty, "page.json"))),
+            ])
+
+    def setUp(self):
+        self.drcty = tempfile.TemporaryDirectory()
+        options = PageReaderTests.Subclass.options(self.drcty.name)
+        self.expert = PageReaderTests.Subclass(**options)
+        self.rson, self.hateoas = (i.dst for i in options.values())
+        self.items = [
+            {"n": n, "tags": ["a", n], "sub": {"x": [1, {"y": "z,\n"}]}} for n in range(20)
+        ] + [7, "eight", None, [], {}]
+
+    def tearDown(self):
+        self.drcty.cleanup()
+
+    def test_index_written(self):
+        self.expert.declare({"items": self.items})
+        for path in (self.rson, self.hateoas):
+            with self.subTest(path=path):
+                self.assertTrue(os.path.isfile(path + ".idx"))
+
+    def test_random_access(self):
+        self.expert.declare({"items": self.items})
+        for path in (self.rson, self.hateoas):
+            with self.subTest(path=path), PageReader(path) as reader:
+                self.assertEqual(len(self.items), len(reader))
+                self.assertEqual(self.items[3], reader[3])
+                self.assertEqual(self.items[-5:], reader[-5:])
+                self.assertEqual(self.items, list(reader))
+
+    def test_scan_without_index(self):
+        self.expert.declare({"items": self.items})
+        for path in (self.rson, self.hateoas):
+            os.remove(path + ".idx")
+            with self.subTest(path=path), PageReader(path) as reader:
+                self.assertEqual(self.items, list(reader))
+
+    def test_stale_index(self):
+        self.expert.declare({"items": self.items})
+        PageReaderTests.Subclass.indexed = False
+        try:
+            self.expert.declare({"items": self.items[:2]})
+        finally:
+            PageReaderTests.Subclass.indexed = True
+        for path in (self.rson, self.hateoas):
+            with self.subTest(path=path), PageReader(path) as reader:
+                self.assertEqual(self.items[:2], list(reader))
+
+    def test_info(self):
+        self.expert.declare({"items": self.items})
+        with PageReader(self.hateoas) as reader:
+            self.assertEqual("Subclass", reader.info["title"])
+            self.assertIn("ts", reader.info)
+        with PageReader(self.rson) as reader:
+            self.assertIsNone(reader.info)
+
+    def test_empty(self):
+        self.expert.declare({"items": []})
+        for path in (self.rson, self.hateoas):
+            with self.subTest(path=path), PageReader(path) as reader:
+                self.assertEqual(0, len(reader))
+
+    def test_incremental_append(self):
+        PageReaderTests.Subclass.incremental = True
+        try:
+            self.expert.declare({"items": self.items[:10]})
+            self.expert.declare({"items": self.items})
+        finally:
+            PageReaderTests.Subclass.incremental = False
+        with PageReader(self.rson) as reader:
+            self.assertIsNotNone(reader.load(os.stat(self.rson)))
+            self.assertEqual(self.items, list(reader))
+
+
+Point = namedtuple("Point", ["x", "y"])
+
+
+class ColumnarPageTests(Registered, unittest.TestCase):
+
+    types = (Point,)
+
+    class Subclass(Expert):
+
+        columnar = True
+        indexed = True
+
+        @staticmethod
+        def options(drcty):
+            return OrderedDict([
+                ("page", Expert.HATEOAS("page", "items", os.path.join(drcty, "page.json"))),
+            ])
+
+    def setUp(self):
+        super().setUp()
+        self.drcty = tempfile.TemporaryDirectory()
+        options = ColumnarPageTests.Subclass.options(self.drcty.name)
+        self.expert = ColumnarPageTests.Subclass(**options)
+        self.hateoas = options["page"].dst
+
+    def tearDown(self):
+        self.drcty.cleanup()
+        super().tearDown()
+
+    def test_batch_unreadable(self):
+        items = [Point(n, -n) for n in range(10)]
+        self.expert.declare({"items": items})
+        self.assertFalse(os.path.exists(self.hateoas + ".idx"))
+        with open(self.hateoas, "r") as page:
+            self.assertEqual(items, list(Assembly.loads(page.read())["items"]))
+        with self.assertRaises(ValueError) as context:
+            PageReader(self.hateoas)
+        self.assertIn("Columnar", str(context.exception))
+
+    def test_mixed_items_readable(self):
+        items = [Point(0, 0), {"n": 1}]
+        self.expert.declare({"items": items})
+        with PageReader(self.hateoas) as reader:
+            self.assertEqual(items, list(reader))
+
+
+class VersionTests(unittest.TestCase):
+
+    class Subclass(Expert):
+
+        @staticmethod
+        def options():
+            return OrderedDict([
+                ("tick", Expert.Attribute("tick")),
+                ("value", Expert.Attribute("value")),
+            ])
+
+    def setUp(self):
+        self.loop = asyncio.new_event_loop()
+        self.expert = VersionTests.Subclass(**VersionTests.Subclass.options())
+        self.expert.declare({"tick": 0, "value": "a"})
+
+    def tearDown(self):
+        self.loop.close()
+
+    def test_sequence(self):
+        seq = VersionTests.Subclass.sequence
+        self.expert.declare({"tick": 0, "value": "a"})
+        self.assertEqual(seq, VersionTests.Subclass.sequence)
+        self.expert.declare({"tick": 1, "value": "a"})
+        self.assertEqual(seq + 1, VersionTests.Subclass.sequence)
+        self.assertEqual(seq + 1, VersionTests.Subclass.stamps["tick"])
+        self.assertLess(VersionTests.Subclass.stamps["value"], seq + 1)
+
+    def test_changed_immediate(self):
+        rv = self.loop.run_until_complete(VersionTests.Subclass.changed(0))
+        self.assertEqual(VersionTests.Subclass.sequence, rv)
+
+    def test_changed_wakes_subscribers(self):
+        seq = VersionTests.Subclass.sequence
+        ticks = asyncio.ensure_future(
+            VersionTests.Subclass.changed(seq, ["tick"], loop=self.loop), loop=self.loop
+        )
+        values = asyncio.ensure_future(
+            VersionTests.Subclass.changed(seq, ["value"], loop=self.loop), loop=self.loop
+        )
+        self.loop.run_until_complete(asyncio.sleep(0))
+        self.assertEqual(2, len(VersionTests.Subclass.waiters))
+
+        self.expert.declare({"tick": 1, "value": "a"})
+        self.loop.run_until_complete(asyncio.sleep(0))
+        self.assertTrue(ticks.done())
+        self.assertEqual(seq + 1, ticks.result())
+        self.assertFalse(values.done())
+
+        values.cancel()
+        self.loop.run_until_complete(asyncio.sleep(0))
+        self.assertEqual([], VersionTests.Subclass.waiters)
+
+    def test_changed_before_construction(self):
+
+        class Late(Expert):
+
+            @staticmethod
+            def options():
+                return OrderedDict([("tick", Expert.Attribute("tick"))])
+
+        ticks = asyncio.ensure_future(Late.changed(0, ["tick"], loop=self.loop), loop=self.loop)
+        self.loop.run_until_complete(asyncio.sleep(0))
+        self.assertEqual(1, len(Late.waiters))
+        self.assertEqual([], Expert.waiters)
+
+        expert = Late(**Late.options())
+        expert.declare({"tick": 1})
+        self.loop.run_until_complete(asyncio.wait_for(ticks, 2))
+        self.assertEqual(Late.sequence, ticks.result())
+        self.assertEqual({}, Expert.stamps)
+
+    def test_mutated_in_place(self):
+        items = ["a"]
+        self.expert.declare({"tick": 0, "value": items})
+        seq = VersionTests.Subclass.sequence
+        self.expert.declare({"tick": 0, "value": items})
+        self.assertEqual(seq + 1, VersionTests.Subclass.sequence)
+        items.append("b")
+        self.expert.declare({"tick": 0, "value": items})
+        self.assertEqual(seq + 2, VersionTests.Subclass.sequence)
+        self.assertEqual(seq + 2, VersionTests.Subclass.stamps["value"])
+        self.assertLess(VersionTests.Subclass.stamps["tick"], seq + 1)
+
+
+def queue(loop, *args, **kwargs):
+    """Make an asyncio Queue which belongs to `loop`."""
+
+    @asyncio.coroutine
+    def make():
+        return asyncio.Queue(*args, **kwargs)
+
+    return loop.run_until_complete(make())
+
+
+class BatchTests(unittest.TestCase):
+
+    class Subclass(Expert):
+
+        batch_size = 50
+        batch_deadline = 0.05
+
+        @asyncio.coroutine
+        def handle_batch(self, batch):
+            self.batches.append(batch)
+
+    def setUp(self):
+        self.loop = asyncio.new_event_loop()
+
+    def tearDown(self):
+        self.loop.close()
+
+    def test_batches(self):
+        q = queue(self.loop)
+        for n in range(120):
+            q.put_nowait(n)
+        q.put_nowait(None)
+        expert = BatchTests.Subclass(q, loop=self.loop)
+        expert.batches = []
+        self.loop.run_until_complete(asyncio.wait_for(expert._watchers[0], 2))
+        self.assertEqual([50, 50, 20], [len(i) for i in expert.batches])
+        self.assertEqual(list(range(120)), [i for b in expert.batches for i in b])
+
+    def test_deadline(self):
+        q = queue(self.loop)
+        expert = BatchTests.Subclass(q, loop=self.loop)
+        expert.batches = []
+
+        @asyncio.coroutine
+        def feed():
+            q.put_nowait(0)
+            yield from asyncio.sleep(0.01)
+            q.put_nowait(1)
+            yield from asyncio.sleep(0.2)
+            q.put_nowait(2)
+            q.put_nowait(None)
+            yield from expert._watchers[0]
+
+        self.loop.run_until_complete(asyncio.wait_for(feed(), 2))
+        self.assertEqual([[0, 1], [2]], expert.batches)
+
+
+class QueueMetricsTests(unittest.TestCase):
+
+    class Subclass(Expert):
+
+        @staticmethod
+        def options():
+            return OrderedDict([("queues", Expert.Queues("queues"))])
+
+    def setUp(self):
+        self.loop = asyncio.new_event_loop()
+
+    def tearDown(self):
+        for task in self.expert._watchers:
+            task.cancel()
+        self.loop.run_until_complete(asyncio.sleep(0))
+        self.loop.close()
+
+    def test_metrics(self):
+        q = queue(self.loop, maxsize=10)
+        for n in range(3):
+            q.put_nowait(n)
+        self.expert = QueueMetricsTests.Subclass(
+            q, loop=self.loop, **QueueMetricsTests.Subclass.options()
+        )
+        self.expert.declare({})
+        self.assertEqual(
+            [{"qsize": 3, "maxsize": 10, "dropped": 0, "paused": False}],
+            QueueMetricsTests.Subclass.public.queues
+        )
+
+
+class InstrumentsTests(unittest.TestCase):
+
+    class Subclass(Expert):
+
+        @staticmethod
+        def options(parent):
+            return OrderedDict([
+                ("items", Expert.RSON("items", "items", os.path.join(parent, "items.rson"))),
+                ("metrics", Expert.Metrics("metrics", os.path.join(parent, "metrics.json"))),
+            ])
+
+        @asyncio.coroutine
+        def watch(self, q, **kwargs):
+            items = []
+            while True:
+                msg = yield from q.get()
+                if msg is None:
+                    return
+                items.append(msg)
+                self.declare({"items": items})
+
+    def setUp(self):
+        self.loop = asyncio.new_event_loop()
+        self.parent = tempfile.mkdtemp()
+        self.options = InstrumentsTests.Subclass.options(self.parent)
+
+    def tearDown(self):
+        InstrumentsTests.Subclass.instruments = None
+        self.loop.close()
+        shutil.rmtree(self.parent, ignore_errors=True)
+
+    def run_expert(self, n):
+        q = queue(self.loop)
+        for i in range(n):
+            q.put_nowait({"n": i})
+        q.put_nowait(None)
+        expert = InstrumentsTests.Subclass(q, loop=self.loop, **self.options)
+        self.loop.run_until_complete(asyncio.wait_for(expert._watchers[0], 2))
+        return expert
+
+    def test_disabled(self):
+        expert = self.run_expert(3)
+        self.assertNotIn("declare", vars(expert))
+        self.assertNotIn("submit", vars(expert))
+        self.assertFalse(os.path.exists(self.options["metrics"].dst))
+
+    def test_histogram(self):
+        instruments = Instruments()
+        instruments.record("a", 0)
+        instruments.record("a", 3e-6)
+        instruments.record("a", 3600)
+        rv = instruments.snapshot()["latency"]["a"]
+        self.assertEqual(3, rv["count"])
+        self.assertEqual(Instruments.buckets, len(rv["histogram"]))
+        self.assertEqual(1, rv["histogram"][0])
+        self.assertEqual(1, rv["histogram"][2])
+        self.assertEqual(1, rv["histogram"][-1])
+
+    def test_counts(self):
+        instruments = InstrumentsTests.Subclass.instruments = Instruments()
+        self.run_expert(5)
+        rv = instruments.snapshot()
+        self.assertEqual(5, rv["counters"]["messages"])
+        self.assertEqual(6, rv["latency"]["wait"]["count"])
+        self.assertEqual(5, rv["latency"]["declare"]["count"])
+        self.assertEqual(6, rv["latency"]["write"]["count"])
+        self.assertGreater(rv["latency"]["watch"]["count"], 0)
+        dst = self.options["items"].dst
+        self.assertGreater(rv["written"][dst], os.path.getsize(dst))
+        dst = self.options["metrics"].dst
+        self.assertEqual(os.path.getsize(dst), rv["written"][dst])
+
+    def test_metrics_page(self):
+        InstrumentsTests.Subclass.instruments = Instruments(interval=3600)
+        self.run_expert(3)
+        with open(self.options["metrics"].dst) as data:
+            page = json.load(data)
+        self.assertEqual(1, len(page["items"]))
+        self.assertEqual(
+            {"counters", "latency", "written"}, set(page["items"][0])
+        )
+
+    def test_busy(self):
+        instruments = Instruments()
+
+        @asyncio.coroutine
+        def work():
+            yield from asyncio.sleep(0)
+            yield from asyncio.sleep(0)
+            return 1
+
+        rv = self.loop.run_until_complete(instruments.busy("call", work()))
+        self.assertEqual(1, rv)
+        self.assertEqual(3, instruments.snapshot()["latency"]["call"]["count"])
+
+
+class Tally(Expert):
+
+    @staticmethod
+    def options():
+        return OrderedDict([
+            ("count", Expert.Attribute("count")),
+            ("keys", Expert.Attribute("keys")),
+        ])
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.keys = set()
+
+    @asyncio.coroutine
+    def __call__(self, loop=None):
+        yield from asyncio.sleep(3600)
+
+    @asyncio.coroutine
+    def watch(self, q, **kwargs):
+        while True:
+            msg = yield from q.get()
+            if msg is None:
+                return
+            key, action = msg
+            if action == "crash":
+                os._exit(1)
+            self.keys.add(key)
+            self.declare({"count": len(self.keys), "keys": sorted(self.keys)})
+
+
+class WorkerOptionsTests(unittest.TestCase):
+
+    def test_files_per_worker(self):
+        options = OrderedDict([
+            ("count", Expert.Attribute("count")),
+            ("items", Expert.RSON("items", "items", os.path.join("data", "items.rson"))),
+            ("page", Expert.HATEOAS("page", "items", None)),
+            ("metrics", Expert.Metrics("metrics", "metrics.json")),
+        ])
+        rv = Supervisor.worker_options(options, 1)
+        self.assertEqual(list(options), list(rv))
+        self.assertEqual(options["count"], rv["count"])
+        self.assertEqual(os.path.join("data", "items-1.rson"), rv["items"].dst)
+        self.assertIsNone(rv["page"].dst)
+        self.assertEqual("metrics-1.json", rv["metrics"].dst)
+        self.assertEqual("items.rson", os.path.basename(options["items"].dst))
+
+
+@unittest.skipUnless(hasattr(os, "fork"), "Forked processes unavailable here.")
+class SupervisorTests(unittest.TestCase):
+
+    def setUp(self):
+        self.loop = asyncio.new_event_loop()
+        self.supervisor = Supervisor(
+            Tally, workers=2, loop=self.loop, context=multiprocessing.get_context("fork"),
+            **Tally.options()
+        )
+
+    def tearDown(self):
+        if not self.supervisor.closing:
+            self.supervisor.close(timeout=5)
+        self.loop.close()
+
+    def test_sharding(self):
+        self.supervisor.start()
+        keys = ["k{0}".format(n) for n in range(20)]
+        for key in keys:
+            for n in range(3):
+                self.supervisor.put_nowait((key, "add"))
+        self.supervisor.close(timeout=5)
+        self.assertEqual(20, sum(Tally.public.count))
+        self.assertEqual(sorted(keys), sorted(k for i in Tally.public.keys for k in i))
+
+    def test_changed(self):
+        self.supervisor.start()
+        seq = Tally.sequence
+        self.supervisor.put_nowait(("a", "add"))
+        rv = self.loop.run_until_complete(
+            asyncio.wait_for(Tally.changed(seq, ["count"], loop=self.loop), 5)
+        )
+        self.assertGreater(rv, seq)
+        self.assertIn(1, Tally.public.count)
+
+    def test_restart(self):
+        self.supervisor.start()
+        self.supervisor.put_nowait(("a", "crash"))
+
+        @asyncio.coroutine
+        def restarted():
+            while not self.supervisor.restarts:
+                yield from asyncio.sleep(0.01)
+
+        self.loop.run_until_complete(asyncio.wait_for(restarted(), 5))
+        self.supervisor.put_nowait(("a", "add"))
+        self.supervisor.close(timeout=5)
+        self.assertEqual(1, sum(i or 0 for i in Tally.public.count))
+
+    def test_put(self):
+        self.supervisor.start()
+        keys = ["k{0}".format(n) for n in range(20)]
+
+        @asyncio.coroutine
+        def send():
+            for key in keys:
+                yield from self.supervisor.put((key, "add"))
+
+        self.loop.run_until_complete(asyncio.wait_for(send(), 5))
+        self.supervisor.close(timeout=5)
+        self.assertEqual(20, sum(Tally.public.count))
@@ -96,3 +96,81 @@ class PipeQueueTest(unittest.TestCase):
             asyncio.wait_for(pq.get(), 2))
         self.assertEqual("S", rv)
         pq.close()
+
+    def test_get_nowait(self):
+        loop = asyncio.get_event_loop()
+        with PipeQueue(self.path) as pq:
+            self.assertRaises(asyncio.QueueEmpty, pq.get_nowait)
+            pq.put_nowait("S")
+            rv = loop.run_until_complete(
+                asyncio.wait_for(pq.get(), 2))
+            self.assertEqual("S", rv)
+            pq._q.put_nowait("T")
+            self.assertEqual("T", pq.get_nowait())
+
+    def test_drop_policy(self):
+        loop = asyncio.get_event_loop()
+        with PipeQueue(self.path, maxsize=2, policy="drop") as pq:
+            for n in range(5):
+                pq.put_nowait(n)
+            loop.run_until_complete(asyncio.sleep(0.1))
+            self.assertEqual(3, pq.metrics["dropped"])
+            self.assertEqual(2, pq.metrics["qsize"])
+            self.assertEqual(0, pq.get_nowait())
+
+    def test_block_policy(self):
+        loop = asyncio.get_event_loop()
+        with PipeQueue(self.path, maxsize=4) as pq:
+            self.assertEqual((4, 2), (pq.high, pq.low))
+            for n in range(6):
+                pq.put_nowait(n)
+            loop.run_until_complete(asyncio.sleep(0.1))
+            self.assertTrue(pq.metrics["paused"])
+            self.assertEqual(4, pq.metrics["qsize"])
+            self.assertEqual(0, pq.metrics["dropped"])
+
+            self.assertEqual(0, pq.get_nowait())
+            self.assertTrue(pq.paused)
+            # Resumes at the low watermark, then refills from the pipe.
+            self.assertEqual(1, pq.get_nowait())
+            self.assertTrue(pq.paused)
+            self.assertEqual(4, pq.metrics["qsize"])
+            rv = [
+                loop.run_until_complete(asyncio.wait_for(pq.get(), 2))
+                for n in range(4)
+            ]
+            self.assertEqual([2, 3, 4, 5], rv)
+            self.assertFalse(pq.paused)
+            loop.run_until_complete(asyncio.wait_for(pq.capacity(), 2))
+
+    def test_put_waits_for_capacity(self):
+        loop = asyncio.get_event_loop()
+        with PipeQueue(self.path, maxsize=4) as pq:
+            sent = []
+
+            @asyncio.coroutine
+            def producer():
+                for n in range(12):
+                    yield from pq.put(n)
+                    sent.append(n)
+                    yield from asyncio.sleep(0.01)
+
+            task = asyncio.ensure_future(producer())
+            loop.run_until_complete(asyncio.sleep(0.2))
+            self.assertTrue(pq.paused)
+            self.assertEqual(4, pq.metrics["qsize"])
+            held = len(sent)
+            self.assertLess(held, 12)
+            loop.run_until_complete(asyncio.sleep(0.1))
+            self.assertEqual(held, len(sent))
+
+            rv = [
+                loop.run_until_complete(asyncio.wait_for(pq.get(), 2))
+                for n in range(12)
+            ]
+            loop.run_until_complete(asyncio.wait_for(task, 2))
+            self.assertEqual(list(range(12)), rv)
+            self.assertEqual(list(range(12)), sent)
+
+    def test_bad_policy(self):
+        self.assertRaises(ValueError, PipeQueue, self.path, policy="discard")
@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+# encoding: UTF-8
+
+# This file is part of turberfield.
+#
+# Turberfield is free software: you can redistribute it and/or modify it
+# under the terms of the GNU General Public License as published
+# by the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Turberfield is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with turberfield.  If not, see <http://www.gnu.org/licenses/>.
+
+from collections import Counter
+from collections import namedtuple
+import datetime
+from decimal import Decimal
+import enum
+import unittest
+
+from turberfield.utils.assembly import Assembly
+from turberfield.utils.test.test_assembly import Registered
+from turberfield.utils.wire import dumpb
+from turberfield.utils.wire import loadb
+
+
+class WireTests(Registered, unittest.TestCase):
+
+    Crate = namedtuple("Crate", ["label", "weight", "contents"])
+
+    class Grade(enum.Enum):
+        light = 1
+        heavy = 2
+
+        @classmethod
+        def factory(cls, name=None, **kwargs):
+            return cls[name]
+
+    types = (Crate, Grade)
+
+    def test_scalars(self):
+        for obj in (
+            None, True, False, 0, 127, 128, -1, -32, -33, -129, 255, 256,
+            65536, 2 ** 32, 2 ** 63, -2 ** 63, 2 ** 64, 2 ** 128, -2 ** 100,
+            0.0, -1.5, 1e300, "", "a" * 31, "b" * 32, "c" * 300, "ǅ\udc80",
+            b"\x00\xff",
+        ):
+            with self.subTest(obj=obj):
+                rv = loadb(dumpb(obj))
+                self.assertEqual(obj, rv)
+                self.assertIs(type(obj), type(rv))
+
+    def test_typed_values(self):
+        obj = [
+            Decimal("3.140"),
+            datetime.datetime(2016, 2, 29, 12, 30, 15, 250),
+            WireTests.Grade.heavy,
+        ]
+        self.assertEqual(obj, loadb(dumpb(obj)))
+        self.assertEqual("3.140", str(loadb(dumpb(obj))[0]))
+
+    def test_datetimes(self):
+        tz = datetime.timezone(-datetime.timedelta(hours=5, minutes=30))
+        for obj in [
+            datetime.datetime(2016, 2, 29),
+            datetime.datetime(2016, 2, 29, 12, 30, 15, 250),
+            datetime.datetime(2016, 2, 29, 12, 30, tzinfo=datetime.timezone.utc),
+            datetime.datetime(2016, 2, 29, 12, 30, 15, 1, tzinfo=tz),
+        ]:
+            with self.subTest(obj=obj):
+                rv = loadb(dumpb(obj))
+                self.assertEqual(obj, rv)
+                self.assertEqual(obj.utcoffset(), rv.utcoffset())
+
+    def test_containers(self):
+        obj = {
+            "a": [1, 2, (3, 4)], 5: {"b": None}, None: list(range(20)),
+            "c": {str(i): i for i in range(20)},
+        }
+        rv = loadb(dumpb(obj))
+        self.assertEqual([1, 2, [3, 4]], rv["a"])
+        self.assertEqual({"b": None}, rv[5])
+        self.assertEqual(obj["c"], rv["c"])
+        self.assertEqual(obj[None], rv[None])
+
+    def test_default_types(self):
+        obj = Counter(a=2)
+        self.assertEqual([["a", 2]], loadb(dumpb(obj)))
+
+    def test_registered_objects(self):
+        obj = [
+            WireTests.Crate("c{0}".format(i), i * 1.5, [WireTests.Grade.light])
+            for i in range(300)
+        ]
+        data = dumpb(obj)
+        self.assertEqual(obj, loadb(data))
+        self.assertLess(len(data), len(Assembly.dumpb(obj)) / 4)
+
+    def test_many_symbols_and_shapes(self):
+        obj = [{"_type": "t{0}".format(i), "k{0}".format(i): i} for i in range(300)]
+        rv = loadb(dumpb(obj + obj))
+        self.assertEqual(600, len(rv))
+        self.assertEqual({"k299": 299}, rv[-1])
+
+    def test_circular(self):
+        obj = []
+        obj.append(obj)
+        self.assertRaises(ValueError, dumpb, obj)
+
+    def test_bad_data(self):
+        self.assertRaises(ValueError, loadb, bytes([0xc1]))
+        self.assertRaises(ValueError, loadb, dumpb(1) + dumpb(2))
+        for data in (
+            bytes([0xd9, 0]), bytes([0xda, 0, 1]), bytes([0xdc, 0]), bytes([0xdd, 1, 0]),
+            bytes([0x92, 0xd8, 1]) + b"a" + bytes([0xd9, 1]),
+        ):
+            with self.subTest(data=data):
+                with self.assertRaises(ValueError) as context:
+                    loadb(data)
+                self.assertIn("reference", str(context.exception))
+        # Unhashable keys: a list, and a map.
+        self.assertRaises(ValueError, loadb, bytes([0x81, 0x90, 1]))
+        self.assertRaises(ValueError, loadb, bytes([0x81, 0x80, 1]))
+        # A shape whose field names are not strings.
+        self.assertRaises(ValueError, loadb, bytes([0xdb, 0xa1]) + b"t" + bytes([1, 0x90]))
+
+    def test_bad_keys(self):
+        obj = {"a": 1, (1, 2): 3, 4.5: [{Decimal(1): 2}]}
+        self.assertRaises(TypeError, dumpb, obj)
+        self.assertEqual({"a": 1, 4.5: [{}]}, loadb(dumpb(obj, skipkeys=True)))
+
+    def test_truncated(self):
+        obj = [
+            WireTests.Crate("c{0}".format(i), i * 1.5, [WireTests.Grade.light, "x" * 40])
+            for i in range(3)
+        ] + [{"k": 2 ** 70, "d": Decimal("0.5")}, b"\x00" * 3, -2 ** 40]
+        data = dumpb(obj)
+        for n in range(len(data)):
+            with self.subTest(n=n):
+                with self.assertRaises(ValueError) as context:
+                    loadb(data[:n])
+                self.assertTrue(str(context.exception).startswith("Truncated"))
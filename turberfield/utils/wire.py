@@ -0,0 +1,527 @@
+#!/usr/bin/env python3
+# encoding: UTF-8
+
+# This file is part of turberfield.
+#
+# Turberfield is free software: you can redistribute it and/or modify it
+# under the terms of the GNU General Public License as published
+# by the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Turberfield is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with turberfield.  If not, see <http://www.gnu.org/licenses/>.
+
+import datetime
+from decimal import Decimal
+import re
+import struct
+
+from turberfield.utils.assembly import Assembly
+
+__doc__ = """
+The module provides a compact binary alternative to the JSON format of
+:py:class:`Assembly <turberfield.utils.assembly.Assembly>`. It uses the
+same registry of types, so anything you can pass to
+:py:meth:`Assembly.dumps <turberfield.utils.assembly.Assembly.dumps>`
+can be passed to :py:func:`dumpb <turberfield.utils.wire.dumpb>`::
+
+    data = dumpb(obj)
+    obj = loadb(data)
+
+The format is in the style of MessagePack_. Numbers are stored in
+binary, and Decimal and datetime objects keep their type. Type tags and
+dictionary keys are defined once per payload and thereafter referred to
+by a small integer id. The same goes for the *shape* of a registered
+object (its tag and field names), so repeated objects of the same type
+cost little more than their values.
+
+.. _MessagePack: https://msgpack.org
+"""
+
+__all__ = ["dumpb", "loadb"]
+
+NIL = 0xc0
+FALSE = 0xc2
+TRUE = 0xc3
+BIN = 0xc4
+STR8 = 0xc5
+STR32 = 0xc6
+ARRAY32 = 0xc7
+MAP32 = 0xc8
+FLOAT64 = 0xcb
+UINT8 = 0xcc
+UINT16 = 0xcd
+UINT32 = 0xce
+UINT64 = 0xcf
+INT8 = 0xd0
+INT16 = 0xd1
+INT32 = 0xd2
+INT64 = 0xd3
+BIGINT = 0xd4
+DECIMAL = 0xd5
+DATETIME = 0xd6
+OBJECT = 0xd7
+SYMBOL = 0xd8
+SYMREF8 = 0xd9
+SYMREF16 = 0xda
+SHAPE = 0xdb
+SHAPEREF8 = 0xdc
+SHAPEREF16 = 0xdd
+
+FIXMAP = 0x80
+FIXARRAY = 0x90
+FIXSTR = 0xa0
+NEGFIX = 0xe0
+
+_u8 = struct.Struct(">B")
+_u16 = struct.Struct(">H")
+_u32 = struct.Struct(">I")
+_u64 = struct.Struct(">Q")
+_i8 = struct.Struct(">b")
+_i16 = struct.Struct(">h")
+_i32 = struct.Struct(">i")
+_i64 = struct.Struct(">q")
+_f64 = struct.Struct(">d")
+
+_isoformat = re.compile(
+    r"(\d{4})-(\d\d)-(\d\d)T(\d\d):(\d\d):(\d\d)(?:\.(\d{6}))?"
+    r"(?:([+-])(\d\d):(\d\d)(?::(\d\d)(?:\.(\d{6}))?)?)?$"
+)
+
+
+def fromisoformat(text):
+    """
+    Return the datetime whose isoformat is `text`.
+
+    """
+    match = _isoformat.match(text)
+    if match is None:
+        raise ValueError("Bad datetime {0!r}".format(text))
+    fields = [int(i) if i and i.isdigit() else 0 for i in match.groups()]
+    tz = None
+    if match.group(8):
+        offset = datetime.timedelta(
+            hours=fields[8], minutes=fields[9], seconds=fields[10], microseconds=fields[11]
+        )
+        tz = datetime.timezone(-offset if match.group(8) == "-" else offset)
+    return datetime.datetime(*fields[:7], tzinfo=tz)
+
+
+
+class Packer:
+    """
+    Encodes one payload. Symbols (type tags and dictionary keys) and
+    shapes are numbered in the order they are first written.
+
+    Dictionary keys must be str, int, float, bool or None, as for JSON.
+    Other keys raise a TypeError, or are skipped if `skipkeys` is True.
+
+    """
+
+    def __init__(self, skipkeys=False, check_circular=True):
+        self.buf = bytearray()
+        self.shapes = {}
+        self.symbols = {}
+        self.skipkeys = skipkeys
+        self.markers = {} if check_circular else None
+        self.encoder = Assembly.Encoder()
+
+    def pack_symbol(self, text):
+        buf = self.buf
+        n = self.symbols.get(text)
+        if n is None:
+            data = text.encode("utf-8", "surrogatepass")
+            if len(data) > 0xff or len(self.symbols) > 0xffff:
+                return self.pack_str(text)
+            self.symbols[text] = len(self.symbols)
+            buf.append(SYMBOL)
+            buf.append(len(data))
+            buf += data
+        elif n <= 0xff:
+            buf.append(SYMREF8)
+            buf.append(n)
+        else:
+            buf.append(SYMREF16)
+            buf += _u16.pack(n)
+
+    def pack_str(self, text):
+        buf = self.buf
+        data = text.encode("utf-8", "surrogatepass")
+        n = len(data)
+        if n < 32:
+            buf.append(FIXSTR | n)
+        elif n <= 0xff:
+            buf.append(STR8)
+            buf.append(n)
+        else:
+            buf.append(STR32)
+            buf += _u32.pack(n)
+        buf += data
+
+    def pack_int(self, val):
+        buf = self.buf
+        if 0 <= val < 0x80:
+            buf.append(val)
+        elif -32 <= val < 0:
+            buf.append(val & 0xff)
+        elif 0 <= val <= 0xffffffffffffffff:
+            if val <= 0xff:
+                buf.append(UINT8)
+                buf.append(val)
+            elif val <= 0xffff:
+                buf.append(UINT16)
+                buf += _u16.pack(val)
+            elif val <= 0xffffffff:
+                buf.append(UINT32)
+                buf += _u32.pack(val)
+            else:
+                buf.append(UINT64)
+                buf += _u64.pack(val)
+        elif -0x8000000000000000 <= val < 0:
+            if val >= -0x80:
+                buf.append(INT8)
+                buf += _i8.pack(val)
+            elif val >= -0x8000:
+                buf.append(INT16)
+                buf += _i16.pack(val)
+            elif val >= -0x80000000:
+                buf.append(INT32)
+                buf += _i32.pack(val)
+            else:
+                buf.append(INT64)
+                buf += _i64.pack(val)
+        else:
+            data = val.to_bytes((val.bit_length() + 8) // 8, "big", signed=True)
+            buf.append(BIGINT)
+            buf += _u16.pack(len(data))
+            buf += data
+
+    def pack_items(self, items, n):
+        buf = self.buf
+        if self.skipkeys:
+            items = [
+                (k, v) for k, v in items if isinstance(k, (str, int, float)) or k is None
+            ]
+            n = len(items)
+        if n < 16:
+            buf.append(FIXMAP | n)
+        else:
+            buf.append(MAP32)
+            buf += _u32.pack(n)
+        for key, value in items:
+            if type(key) is str:
+                self.pack_symbol(key)
+            elif isinstance(key, (str, int, float)) or key is None:
+                self.pack(key)
+            else:
+                raise TypeError("key " + repr(key) + " is not a string")
+            self.pack(value)
+
+    def pack_object(self, tag, obj):
+        buf = self.buf
+        shape = (tag, tuple(obj))
+        n = self.shapes.get(shape)
+        if n is None:
+            fields = [k for k in obj if k != "_type"]
+            if (
+                len(self.shapes) > 0xffff or len(fields) > 0xff or
+                not all(type(k) is str for k in fields)
+            ):
+                buf.append(OBJECT)
+                self.pack_symbol(tag)
+                self.pack_items(
+                    ((k, v) for k, v in obj.items() if k != "_type"), len(fields)
+                )
+                return
+
+            n = self.shapes[shape] = len(self.shapes)
+            buf.append(SHAPE)
+            self.pack_symbol(tag)
+            buf.append(len(fields))
+            for k in fields:
+                self.pack_symbol(k)
+        elif n <= 0xff:
+            buf.append(SHAPEREF8)
+            buf.append(n)
+        else:
+            buf.append(SHAPEREF16)
+            buf += _u16.pack(n)
+
+        for k, v in obj.items():
+            if k != "_type":
+                self.pack(v)
+
+    def pack_container(self, obj):
+        markers = self.markers
+        if markers is not None:
+            markerid = id(obj)
+            if markerid in markers:
+                raise ValueError("Circular reference detected")
+            markers[markerid] = obj
+
+        if type(obj) is dict:
+            tag = obj.get("_type")
+            if type(tag) is str:
+                self.pack_object(tag, obj)
+            else:
+                self.pack_items(obj.items(), len(obj))
+        else:
+            buf = self.buf
+            n = len(obj)
+            if n < 16:
+                buf.append(FIXARRAY | n)
+            else:
+                buf.append(ARRAY32)
+                buf += _u32.pack(n)
+            for i in obj:
+                self.pack(i)
+
+        if markers is not None:
+            del markers[markerid]
+
+    def pack(self, obj):
+        buf = self.buf
+        if isinstance(obj, str):
+            self.pack_str(obj)
+        elif obj is None:
+            buf.append(NIL)
+        elif obj is True:
+            buf.append(TRUE)
+        elif obj is False:
+            buf.append(FALSE)
+        elif isinstance(obj, int):
+            self.pack_int(int(obj))
+        elif isinstance(obj, float):
+            buf.append(FLOAT64)
+            buf += _f64.pack(obj)
+        elif isinstance(obj, list) or type(obj) is tuple or type(obj) is dict:
+            self.pack_container(obj)
+        elif isinstance(obj, Decimal):
+            data = str(obj).encode("ascii")
+            buf.append(DECIMAL)
+            buf += _u16.pack(len(data))
+            buf += data
+        elif isinstance(obj, datetime.datetime):
+            data = obj.isoformat().encode("ascii")
+            buf.append(DATETIME)
+            buf.append(len(data))
+            buf += data
+        elif isinstance(obj, (bytes, bytearray)):
+            buf.append(BIN)
+            buf += _u32.pack(len(obj))
+            buf += obj
+        else:
+            markers = self.markers
+            if markers is not None:
+                markerid = id(obj)
+                if markerid in markers:
+                    raise ValueError("Circular reference detected")
+                markers[markerid] = obj
+            self.pack(self.encoder.default(obj))
+            if markers is not None:
+                del markers[markerid]
+
+
+class Unpacker:
+    """
+    Decodes one payload. A payload which ends before its last value,
+    or which refers to a symbol or shape it has not defined, raises a
+    ValueError.
+
+    """
+
+    def __init__(self, data):
+        self.data = data if isinstance(data, bytes) else bytes(data)
+        self.size = len(self.data)
+        self.pos = 0
+        self.shapes = []
+        self.symbols = []
+
+    def truncated(self, pos):
+        return ValueError("Truncated data at {0}".format(pos))
+
+    def reference(self, kind, pos):
+        return ValueError("Bad {0} reference at {1}".format(kind, pos))
+
+    def shape(self, n, pos):
+        try:
+            return self.shapes[n]
+        except IndexError:
+            raise self.reference("shape", pos) from None
+
+    def symbol(self, n, pos):
+        try:
+            return self.symbols[n]
+        except IndexError:
+            raise self.reference("symbol", pos) from None
+
+    def take(self, n):
+        pos = self.pos
+        end = self.pos = pos + n
+        if end > self.size:
+            raise self.truncated(pos)
+        return self.data[pos:end]
+
+    def unpack_struct(self, fmt):
+        pos = self.pos
+        self.pos = pos + fmt.size
+        if self.pos > self.size:
+            raise self.truncated(pos)
+        return fmt.unpack_from(self.data, pos)[0]
+
+    def unpack_items(self, n):
+        unpack = self.unpack
+        rv = {}
+        for i in range(n):
+            pos = self.pos
+            key = unpack()
+            value = unpack()
+            try:
+                rv[key] = value
+            except TypeError:
+                raise ValueError("Bad key {0!r} at {1}".format(key, pos)) from None
+        return rv
+
+    def unpack_shape(self, tag, fields):
+        unpack = self.unpack
+        rv = {k: unpack() for k in fields}
+        rv["_type"] = tag
+        return Assembly.object_hook(rv)
+
+    def unpack(self):
+        data = self.data
+        size = self.size
+        pos = self.pos
+        if pos >= size:
+            raise self.truncated(pos)
+        code = data[pos]
+        self.pos = pos + 1
+        if code < 0x80:
+            return code
+        elif code == SHAPEREF8:
+            if pos + 2 > size:
+                raise self.truncated(pos)
+            self.pos = pos + 2
+            return self.unpack_shape(*self.shape(data[pos + 1], pos))
+        elif code == SYMREF8:
+            if pos + 2 > size:
+                raise self.truncated(pos)
+            self.pos = pos + 2
+            return self.symbol(data[pos + 1], pos)
+        elif FIXSTR <= code < NIL:
+            end = self.pos = pos + 1 + (code & 0x1f)
+            if end > size:
+                raise self.truncated(pos)
+            return data[pos + 1:end].decode("utf-8", "surrogatepass")
+        elif code == FLOAT64:
+            if pos + 9 > size:
+                raise self.truncated(pos)
+            self.pos = pos + 9
+            return _f64.unpack_from(data, pos + 1)[0]
+        elif code >= NEGFIX:
+            return code - 0x100
+        elif code < FIXARRAY:
+            return self.unpack_items(code & 0x0f)
+        elif code < FIXSTR:
+            unpack = self.unpack
+            return [unpack() for i in range(code & 0x0f)]
+        elif code == NIL:
+            return None
+        elif code == FALSE:
+            return False
+        elif code == TRUE:
+            return True
+        elif code == SHAPE:
+            tag = self.unpack()
+            n = self.unpack_struct(_u8)
+            shape = (tag, tuple(self.unpack() for i in range(n)))
+            if not all(isinstance(i, str) for i in shape[1]):
+                raise ValueError("Bad shape {0!r} at {1}".format(shape, pos))
+            self.shapes.append(shape)
+            return self.unpack_shape(*shape)
+        elif code == SHAPEREF16:
+            return self.unpack_shape(*self.shape(self.unpack_struct(_u16), pos))
+        elif code == SYMREF16:
+            return self.symbol(self.unpack_struct(_u16), pos)
+        elif code == SYMBOL:
+            rv = str(self.take(self.unpack_struct(_u8)), "utf-8", "surrogatepass")
+            self.symbols.append(rv)
+            return rv
+        elif code == OBJECT:
+            tag = self.unpack()
+            code = self.unpack_struct(_u8)
+            if code == MAP32:
+                rv = self.unpack_items(self.unpack_struct(_u32))
+            else:
+                rv = self.unpack_items(code & 0x0f)
+            rv["_type"] = tag
+            return Assembly.object_hook(rv)
+        elif code == STR8:
+            return str(self.take(self.unpack_struct(_u8)), "utf-8", "surrogatepass")
+        elif code == STR32:
+            return str(self.take(self.unpack_struct(_u32)), "utf-8", "surrogatepass")
+        elif code == ARRAY32:
+            unpack = self.unpack
+            return [unpack() for i in range(self.unpack_struct(_u32))]
+        elif code == MAP32:
+            return self.unpack_items(self.unpack_struct(_u32))
+        elif code == UINT8:
+            return self.unpack_struct(_u8)
+        elif code == UINT16:
+            return self.unpack_struct(_u16)
+        elif code == UINT32:
+            return self.unpack_struct(_u32)
+        elif code == UINT64:
+            return self.unpack_struct(_u64)
+        elif code == INT8:
+            return self.unpack_struct(_i8)
+        elif code == INT16:
+            return self.unpack_struct(_i16)
+        elif code == INT32:
+            return self.unpack_struct(_i32)
+        elif code == INT64:
+            return self.unpack_struct(_i64)
+        elif code == BIGINT:
+            return int.from_bytes(self.take(self.unpack_struct(_u16)), "big", signed=True)
+        elif code == DECIMAL:
+            return Decimal(str(self.take(self.unpack_struct(_u16)), "ascii"))
+        elif code == DATETIME:
+            return fromisoformat(str(self.take(self.unpack_struct(_u8)), "ascii"))
+        elif code == BIN:
+            return bytes(self.take(self.unpack_struct(_u32)))
+        else:
+            raise ValueError("Unknown code {0:#x} at {1}".format(code, self.pos - 1))
+
+
+def dumpb(obj, skipkeys=False, check_circular=True):
+    """
+    Serialize `obj` to bytes in the binary format.
+
+    Dictionary keys follow the rules of
+    :py:meth:`Assembly.dumps <turberfield.utils.assembly.Assembly.dumps>`.
+    If `skipkeys` is True, those which are not str, int, float, bool or
+    None are skipped; otherwise they raise a TypeError.
+
+    """
+    packer = Packer(skipkeys=skipkeys, check_circular=check_circular)
+    packer.pack(obj)
+    return bytes(packer.buf)
+
+
+def loadb(data):
+    """
+    Deserialize bytes in the binary format to Python object(s). Those
+    types you have registered will be recognised and used to create the
+    deserialised objects.
+
+    """
+    unpacker = Unpacker(data)
+    rv = unpacker.unpack()
+    if unpacker.pos != len(unpacker.data):
+        raise ValueError("Extra data at {0}".format(unpacker.pos))
+    return rv